@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк извлечения данных scrape.py на сохранённой странице бренда.
+
+Сравнивает стоимость извлечения на одну модель:
+  raw         - elementpath.select() с разбором выражения на каждый вызов (как было);
+  elementpath - выражения скомпилированы один раз, выполняются elementpath (XPath 3.0);
+  auto        - как в scrape.py: lxml для выражений XPath 1.0, elementpath для остальных.
+
+Пример:
+    curl -s https://haval.ru/models/ -o /tmp/haval.html
+    python3 .github/scripts/bench_scrape.py haval --html /tmp/haval.html --repeat 20
+"""
+
+import argparse
+import sys
+import time
+
+import elementpath
+from elementpath.xpath3 import XPath3Parser
+from lxml import html
+
+from scrape import compile_xpath
+from scrape_all import MANIFEST_PATH, load_manifest
+
+FIELD_KEYS = ('id_xpath', 'model_xpath', 'price_xpath', 'link_xpath')
+
+
+def extract_raw(tree, xpaths):
+    items = elementpath.select(tree, xpaths['item_xpath'], parser=XPath3Parser)
+    for item in items:
+        for key in FIELD_KEYS:
+            elementpath.select(item, xpaths[key], parser=XPath3Parser)
+    return len(items)
+
+
+def make_extract(engine):
+    def extract(tree, xpaths):
+        selectors = {key: compile_xpath(xpaths[key], engine=engine) for key in ('item_xpath',) + FIELD_KEYS}
+        items = selectors['item_xpath'].select(tree)
+        for item in items:
+            for key in FIELD_KEYS:
+                selectors[key].select(item)
+        return len(items)
+    return extract
+
+
+MODES = (
+    ('raw', extract_raw),
+    ('elementpath', make_extract('elementpath')),
+    ('auto', make_extract('auto')),
+)
+
+
+def measure(func, tree, xpaths, repeat):
+    """Возвращает (число моделей, лучшее время прогона в секундах)."""
+    best = None
+    items = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = func(tree, xpaths)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return items, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарк извлечения XPath на сохранённой странице')
+    parser.add_argument('brand', help='Имя бренда из манифеста')
+    parser.add_argument('--html', required=True, help='Путь к сохранённому HTML страницы бренда')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='Путь к манифесту брендов')
+    parser.add_argument('--repeat', type=int, default=10, help='Число прогонов, берётся лучший')
+    args = parser.parse_args(argv)
+
+    cfg = load_manifest(args.manifest)[args.brand]
+    xpaths = {key: cfg[key] for key in ('item_xpath',) + FIELD_KEYS}
+
+    with open(args.html, 'rb') as f:
+        tree = html.fromstring(f.read())
+
+    # Прогреваем кэш, чтобы скомпилированные режимы измеряли только выполнение
+    for _, func in MODES[1:]:
+        func(tree, xpaths)
+
+    engines = ', '.join(f"{key}={compile_xpath(xpaths[key], engine='auto').engine}" for key in ('item_xpath',) + FIELD_KEYS)
+    print(f"XPath движки для {args.brand}: {engines}")
+
+    print(f"{'mode':<12} {'items':>6} {'ms/page':>10} {'ms/item':>10}")
+    for name, func in MODES:
+        items, best = measure(func, tree, xpaths, args.repeat)
+        per_item = best / items * 1000 if items else 0
+        print(f"{name:<12} {items:>6} {best * 1000:>10.2f} {per_item:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
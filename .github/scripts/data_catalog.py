@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Каталог данных сайтов src/<сайт>/data для служебных скриптов.
+
+Один проход os.scandir по src находит сайты и файлы в их каталогах data;
+содержимое файлов читается лениво, при первом обращении, и запоминается
+вместе с mtime и размером: если файл изменился на диске, он перечитывается.
+Индексы строятся по требованию и живут до следующего scan():
+сайт -> файлы, имя файла -> сайты, бренд -> сайты (поле brand из settings.json).
+
+Пример:
+    from data_catalog import DataCatalog
+    catalog = DataCatalog('src')
+    for site in catalog.file_sites('banners.json'):
+        banners = catalog.load(site, 'banners.json')
+
+Разобранные объекты общие для всех обращений - изменяйте копию.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[2] / 'src'
+DATA_DIRNAME = 'data'
+SETTINGS_FILENAME = 'settings.json'
+
+_MISSING = object()
+
+
+def parse_brands(value):
+    """Поле brand из settings.json: "WEY" или "Toyota, Lexus" -> ['toyota', 'lexus']."""
+    if not isinstance(value, str):
+        return []
+    return [brand.strip().lower() for brand in value.split(',') if brand.strip()]
+
+
+class DataCatalog:
+    def __init__(self, root=SRC_DIR):
+        self.root = Path(root)
+        self._dirs = None
+        self._files = None
+        self._file_sites = None
+        self._brand_sites = None
+        # путь -> ((mtime_ns, размер), текст, разобранный объект или _MISSING)
+        self._memo = {}
+
+    def scan(self):
+        """Перечитывает список сайтов и файлов; индексы строятся заново."""
+        dirs = []
+        files = {}
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                dirs.append(entry.name)
+                try:
+                    with os.scandir(os.path.join(entry.path, DATA_DIRNAME)) as data_entries:
+                        files[entry.name] = {
+                            data_entry.name: Path(data_entry.path)
+                            for data_entry in data_entries if data_entry.is_file()
+                        }
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+
+        self._dirs = sorted(dirs)
+        self._files = {site: dict(sorted(files[site].items())) for site in sorted(files)}
+        self._file_sites = None
+        self._brand_sites = None
+        return self
+
+    def _scanned(self):
+        if self._files is None:
+            self.scan()
+        return self._files
+
+    def sites(self, with_data=True):
+        """Сайты с каталогом data (with_data=False - все подкаталоги src)."""
+        self._scanned()
+        return list(self._files) if with_data else list(self._dirs)
+
+    def data_dir(self, site):
+        return self.root / site / DATA_DIRNAME
+
+    def files(self, site):
+        """Файлы каталога data сайта: {имя: путь}."""
+        return self._scanned().get(site, {})
+
+    def site_files(self):
+        """Индекс сайт -> {имя файла: путь}."""
+        return self._scanned()
+
+    def file_sites(self, name):
+        """Сайты, в каталоге data которых есть файл name."""
+        if self._file_sites is None:
+            index = {}
+            for site, files in self._scanned().items():
+                for filename in files:
+                    index.setdefault(filename, []).append(site)
+            self._file_sites = index
+        return self._file_sites.get(name, [])
+
+    def paths(self, name):
+        """Пути к файлу name во всех сайтах, где он есть."""
+        return [self._files[site][name] for site in self.file_sites(name)]
+
+    def missing(self, name):
+        """Сайты с каталогом data, в которых нет файла name."""
+        present = set(self.file_sites(name))
+        return [site for site in self.sites() if site not in present]
+
+    def brand_sites(self):
+        """Индекс бренд (в нижнем регистре) -> сайты по полю brand из settings.json."""
+        if self._brand_sites is None:
+            index = {}
+            for site in self.file_sites(SETTINGS_FILENAME):
+                settings = self.load(site, SETTINGS_FILENAME, default=None)
+                if not isinstance(settings, dict):
+                    continue
+                for brand in parse_brands(settings.get('brand')):
+                    index.setdefault(brand, []).append(site)
+            self._brand_sites = index
+        return self._brand_sites
+
+    def path(self, site_or_path, name=None):
+        if name is None:
+            return Path(site_or_path)
+        return self.data_dir(site_or_path) / name
+
+    def _entry(self, path):
+        """Запись кэша для файла; устаревшая (другой mtime или размер) перечитывается."""
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        entry = self._memo.get(path)
+        if entry is None or entry[0] != key:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = [key, f.read(), _MISSING]
+            self._memo[path] = entry
+        return entry
+
+    def read_text(self, site_or_path, name=None):
+        """Текст файла: read_text(сайт, имя) или read_text(путь)."""
+        return self._entry(self.path(site_or_path, name))[1]
+
+    def load(self, site_or_path, name=None, default=_MISSING):
+        """
+        Разобранный JSON или YAML: load(сайт, имя) или load(путь).
+        Если передан default, он возвращается вместо ошибки для
+        отсутствующего или неразбираемого файла.
+        """
+        path = self.path(site_or_path, name)
+        try:
+            entry = self._entry(path)
+            if entry[2] is _MISSING:
+                entry[2] = parse_text(path, entry[1])
+            return entry[2]
+        except (OSError, ValueError):
+            if default is _MISSING:
+                raise
+            return default
+
+    def forget(self, site_or_path, name=None):
+        """Убирает файл из кэша (например, после записи в ту же секунду с тем же размером)."""
+        self._memo.pop(self.path(site_or_path, name), None)
+
+
+def parse_text(path, text):
+    """Разбирает текст файла по расширению: YAML для .yml/.yaml, иначе JSON."""
+    if path.suffix in ('.yml', '.yaml'):
+        import yaml
+        # Сборка PyYAML с libyaml разбирает в разы быстрее чистого Python
+        loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+        try:
+            return yaml.load(text, Loader=loader)
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path}: {e}") from e
+    return json.loads(text)
+
+
+def main(argv=None):
+    """Краткая сводка каталога: сайты, файлы и бренды."""
+    root = Path(argv[0]) if argv else SRC_DIR
+    catalog = DataCatalog(root)
+    sites = catalog.sites()
+    print(f"Сайтов с data: {len(sites)}, файлов: {sum(len(catalog.files(site)) for site in sites)}")
+    names = {name for site in sites for name in catalog.files(site)}
+    for name in sorted(names, key=lambda name: (-len(catalog.file_sites(name)), name)):
+        print(f"  {name:<32} {len(catalog.file_sites(name)):>4}")
+    print(f"Брендов в settings.json: {len(catalog.brand_sites())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Индекс SQLite по всем файлам данных src для быстрых поисков по сайтам.
+
+Для каждого файла хранятся путь, сайт, размер, mtime и sha256, а также
+извлечённые ключи:
+  refs         - ссылки на модели: пары mark_id/id (models.json), brand/id
+                 (cars.json), id моделей models-sections.yml и ключи
+                 federal-disclaimer.json;
+  placeholders - подстановки {{...}};
+  urls         - адреса http(s) из строковых значений;
+  settings     - поля верхнего уровня settings.json.
+Повторная индексация разбирает только файлы с другим mtime или размером,
+а если при этом совпал sha256 - только обновляет mtime.
+
+Индекс обновляется перед каждым запросом (это быстро: stat по файлам
+без чтения). База - обычный файл SQLite, её можно открыть и из PHP.
+
+Пример:
+    python3 .github/scripts/data_index.py index
+    python3 .github/scripts/data_index.py model x75 --brand baic
+    python3 .github/scripts/data_index.py empty federal-disclaimer.json
+    python3 .github/scripts/data_index.py url cdn.alexsab.ru/models/baic/x35/bg.webp
+    python3 .github/scripts/data_index.py placeholder price-baic-x75
+    python3 .github/scripts/data_index.py setting brand --value BAIC --json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from data_catalog import SRC_DIR, parse_text
+
+INDEX_PATH = os.getenv('DATA_INDEX_PATH', str(Path(__file__).resolve().parents[2] / '.cache' / 'data-index.sqlite'))
+DATA_EXTENSIONS = ('.json', '.yml', '.yaml')
+
+# Увеличивается при изменении схемы или правил извлечения - индекс строится заново
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE files (
+    path TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    empty INTEGER NOT NULL,
+    error TEXT
+);
+CREATE INDEX files_name ON files (name, site);
+CREATE TABLE refs (path TEXT NOT NULL, site TEXT NOT NULL, kind TEXT NOT NULL, mark_id TEXT, model_id TEXT NOT NULL);
+CREATE INDEX refs_model ON refs (model_id);
+CREATE INDEX refs_path ON refs (path);
+CREATE TABLE placeholders (path TEXT NOT NULL, site TEXT NOT NULL, name TEXT NOT NULL);
+CREATE INDEX placeholders_name ON placeholders (name);
+CREATE INDEX placeholders_path ON placeholders (path);
+CREATE TABLE urls (path TEXT NOT NULL, site TEXT NOT NULL, url TEXT NOT NULL);
+CREATE INDEX urls_url ON urls (url);
+CREATE INDEX urls_path ON urls (path);
+CREATE TABLE settings (path TEXT NOT NULL, site TEXT NOT NULL, key TEXT NOT NULL, value TEXT);
+CREATE INDEX settings_key ON settings (key, value);
+CREATE INDEX settings_path ON settings (path);
+"""
+
+KEY_TABLES = ('refs', 'placeholders', 'urls', 'settings')
+
+_PLACEHOLDER_RE = re.compile(r'\{\{\s*([^{}\s]+)\s*\}\}')
+_URL_RE = re.compile(r'https?://[^\s"\'<>()]+')
+
+
+def connect(path=INDEX_PATH):
+    if path != ':memory:':
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    if db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        for table in ('files',) + KEY_TABLES:
+            db.execute(f'DROP TABLE IF EXISTS {table}')
+        db.executescript(SCHEMA)
+        db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        db.commit()
+    return db
+
+
+def scan_files(root):
+    """Все файлы данных под root одним обходом os.scandir: {относительный путь: (entry, stat)}."""
+    found = {}
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.name.endswith(DATA_EXTENSIONS):
+                    found[os.path.relpath(entry.path, root).replace(os.sep, '/')] = (entry, entry.stat())
+    return found
+
+
+def site_of(path):
+    """src/<сайт>/data/... -> сайт; общие файлы (models.json, model-sections) -> ''."""
+    parts = path.split('/')
+    return parts[0] if len(parts) == 3 and parts[1] == 'data' else ''
+
+
+def is_empty(value):
+    return value is None or value == '' or value == [] or value == {}
+
+
+def iter_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from iter_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_strings(item)
+
+
+def iter_dicts(value):
+    if isinstance(value, dict):
+        yield value
+        for item in value.values():
+            yield from iter_dicts(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_dicts(item)
+
+
+def extract_refs(name, data):
+    """Ссылки на модели: [(вид, mark_id или None, model_id)]."""
+    refs = []
+    for item in iter_dicts(data):
+        model_id = item.get('id')
+        if not isinstance(model_id, (str, int)) or isinstance(model_id, bool) or model_id == '':
+            continue
+        model_id = str(model_id)
+        if isinstance(item.get('mark_id'), str):
+            refs.append(('model', item['mark_id'].lower(), model_id))
+        elif isinstance(item.get('brand'), str) and 'model' in item:
+            # cars.json: id вида "<бренд>-<модель>"
+            brand = item['brand'].lower()
+            refs.append(('car', brand, model_id[len(brand) + 1:] if model_id.startswith(f"{brand}-") else model_id))
+
+    if name == 'models-sections.yml' and isinstance(data, list):
+        refs.extend(('section', None, str(item['id'])) for item in data if isinstance(item, dict) and item.get('id'))
+    elif name == 'federal-disclaimer.json' and isinstance(data, dict):
+        refs.extend(('disclaimer', None, key) for key in data)
+    return refs
+
+
+def extract_keys(path, data):
+    """Извлечённые ключи файла по таблицам: {таблица: [строки без path и site]}."""
+    name = path.rsplit('/', 1)[-1]
+    strings = list(iter_strings(data))
+    keys = {
+        'refs': extract_refs(name, data),
+        'placeholders': sorted({(match,) for text in strings for match in _PLACEHOLDER_RE.findall(text)}),
+        'urls': sorted({(url.rstrip('.,;'),) for text in strings for url in _URL_RE.findall(text)}),
+        'settings': [],
+    }
+    if name == 'settings.json' and isinstance(data, dict):
+        keys['settings'] = [
+            (key, value if isinstance(value, str) else json.dumps(value, ensure_ascii=False))
+            for key, value in data.items()
+        ]
+    return keys
+
+
+def index_file(db, path, site, full_path, stat, content, previous_hash):
+    """Записывает файл и его ключи; если sha256 совпал с прежним, ключи не трогаются."""
+    sha256 = hashlib.sha256(content).hexdigest()
+    if sha256 == previous_hash:
+        db.execute('UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?', (stat.st_size, stat.st_mtime_ns, path))
+        return False
+
+    error = None
+    try:
+        data = parse_text(Path(full_path), content.decode('utf-8'))
+        keys = extract_keys(path, data)
+        empty = is_empty(data)
+    except (UnicodeDecodeError, ValueError) as e:
+        error, keys = str(e), {table: [] for table in KEY_TABLES}
+        empty = not content.strip()
+
+    for table in KEY_TABLES:
+        db.execute(f'DELETE FROM {table} WHERE path = ?', (path,))
+    db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+               (path, site, path.rsplit('/', 1)[-1], stat.st_size, stat.st_mtime_ns, sha256, int(empty), error))
+    for table, rows in keys.items():
+        if rows:
+            placeholders = ', '.join('?' * (len(rows[0]) + 2))
+            db.executemany(f'INSERT INTO {table} VALUES ({placeholders})', [(path, site) + tuple(row) for row in rows])
+    return True
+
+
+def update_index(db, root=SRC_DIR):
+    """
+    Приводит индекс в соответствие с файлами под root.
+    Возвращает счётчики: files, parsed, touched (тот же sha256), removed.
+    """
+    known = {path: (size, mtime_ns, sha256) for path, size, mtime_ns, sha256
+             in db.execute('SELECT path, size, mtime_ns, sha256 FROM files')}
+    stats = {'files': 0, 'parsed': 0, 'touched': 0, 'removed': 0}
+
+    with db:
+        for path, (entry, stat) in scan_files(str(root)).items():
+            stats['files'] += 1
+            previous = known.pop(path, None)
+            if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                continue
+            with open(entry.path, 'rb') as f:
+                content = f.read()
+            changed = index_file(db, path, site_of(path), entry.path, stat, content, previous[2] if previous else None)
+            stats['parsed' if changed else 'touched'] += 1
+
+        for path in known:
+            for table in ('files',) + KEY_TABLES:
+                db.execute(f'DELETE FROM {table} WHERE path = ?', (path,))
+            stats['removed'] += 1
+    return stats
+
+
+def like_escape(value):
+    """Экранирует % и _ для LIKE ... ESCAPE '\\': подстрока ищется буквально."""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def query_model(db, model_id, brand=None):
+    """
+    Ссылки на модель: точное совпадение id, а для ключей без бренда (federal-disclaimer.json)
+    ещё и вида "<бренд>-<id>" для известных брендов - без шаблонов LIKE.
+    """
+    brand = brand.lower() if brand else None
+    brand_filter = " AND mark_id = ?" if brand else ""
+    sql = ("SELECT DISTINCT site, path, kind, mark_id, model_id FROM refs "
+           f"WHERE (mark_id IS NOT NULL AND model_id = ?{brand_filter}) "
+           "OR (mark_id IS NULL AND (model_id = ? OR model_id IN "
+           f"(SELECT mark_id || '-' || ? FROM refs WHERE mark_id IS NOT NULL{brand_filter}))) "
+           "ORDER BY site, path")
+    brand_params = [brand] if brand else []
+    return db.execute(sql, [model_id] + brand_params + [model_id, model_id] + brand_params)
+
+
+def query_empty(db, name):
+    return db.execute("SELECT site, path FROM files WHERE name = ? AND empty = 1 ORDER BY site", (name,))
+
+
+def query_url(db, fragment):
+    return db.execute("SELECT DISTINCT site, path, url FROM urls WHERE url LIKE ? ESCAPE '\\' ORDER BY site, path",
+                      (f"%{like_escape(fragment)}%",))
+
+
+def query_placeholder(db, name):
+    return db.execute("SELECT DISTINCT site, path FROM placeholders WHERE name = ? ORDER BY site, path", (name,))
+
+
+def query_setting(db, key, value=None):
+    if value is None:
+        return db.execute("SELECT site, value FROM settings WHERE key = ? ORDER BY site", (key,))
+    return db.execute("SELECT site, value FROM settings WHERE key = ? AND value = ? ORDER BY site", (key, value))
+
+
+def print_rows(cursor, as_json):
+    columns = [column[0] for column in cursor.description]
+    rows = cursor.fetchall()
+    if as_json:
+        print(json.dumps([dict(zip(columns, row)) for row in rows], ensure_ascii=False, indent=2))
+    else:
+        for row in rows:
+            print('\t'.join('' if value is None else str(value) for value in row))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Индекс SQLite по файлам данных src и поиск по нему')
+    parser.add_argument('--db', default=INDEX_PATH, help='Файл базы индекса')
+    parser.add_argument('--root', default=str(SRC_DIR), help='Каталог данных')
+    # Общие ключи запросов, принимаются после имени команды
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--json', action='store_true', help='Вывод в JSON')
+    common.add_argument('--no-update', action='store_true', help='Не обновлять индекс перед запросом')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('index', help='Обновить индекс')
+    model = subparsers.add_parser('model', parents=[common], help='Где упоминается модель')
+    model.add_argument('model_id')
+    model.add_argument('--brand', help='Бренд (mark_id)')
+    empty = subparsers.add_parser('empty', parents=[common], help='Сайты с пустым файлом')
+    empty.add_argument('name', help='Имя файла, например federal-disclaimer.json')
+    url = subparsers.add_parser('url', parents=[common], help='Где используется адрес (поиск по подстроке)')
+    url.add_argument('fragment')
+    placeholder = subparsers.add_parser('placeholder', parents=[common], help='Где используется подстановка {{...}}')
+    placeholder.add_argument('name', help='Имя без фигурных скобок')
+    setting = subparsers.add_parser('setting', parents=[common], help='Значения поля settings.json по сайтам')
+    setting.add_argument('key')
+    setting.add_argument('--value', help='Только сайты с этим значением')
+    args = parser.parse_args(argv)
+
+    db = connect(args.db)
+    if args.command == 'index' or not args.no_update:
+        started = time.perf_counter()
+        stats = update_index(db, args.root)
+        if args.command == 'index':
+            print(f"Файлов: {stats['files']}, разобрано: {stats['parsed']}, без изменений содержимого: "
+                  f"{stats['touched']}, удалено: {stats['removed']} за {time.perf_counter() - started:.2f}s")
+            return 0
+
+    if args.command == 'model':
+        cursor = query_model(db, args.model_id, args.brand)
+    elif args.command == 'empty':
+        cursor = query_empty(db, args.name)
+    elif args.command == 'url':
+        cursor = query_url(db, args.fragment)
+    elif args.command == 'placeholder':
+        cursor = query_placeholder(db, args.name.strip('{} '))
+    else:
+        cursor = query_setting(db, args.key, args.value)
+    print_rows(cursor, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Объединение cars.json брендов в файлы многобрендовых дилеров (замена mergeJson.js).
+
+Цели и их источники описаны в merge-targets.json. Модели берутся в порядке
+источников; если id уже встречался в одном из предыдущих источников, модель
+пропускается (повторы внутри одного бренда сохраняются - это разные
+комплектации). Каждая цель записывается один раз и только при изменении.
+
+При запуске из scrape_all.py данные только что обработанных брендов
+передаются из памяти, остальные источники читаются с диска.
+
+Пример:
+    python3 .github/scripts/merge_json.py
+"""
+
+import json
+import os
+import sys
+
+from scrape import changeset, logError, read_json_file, save_json
+
+MERGE_TARGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'merge-targets.json')
+
+
+def load_targets(path=MERGE_TARGETS_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def merge_sources(sources, records=None):
+    """
+    Объединяет модели источников. records - {путь источника: список моделей}
+    для источников, данные которых уже есть в памяти. Если источник не найден
+    или не читается, выбрасывает ValueError: цель без одного из брендов не пишется.
+    """
+    records = {os.path.normpath(path): data for path, data in (records or {}).items()}
+    merged = []
+    seen = set()
+    for source in sources:
+        data = records.get(os.path.normpath(source))
+        if data is None:
+            data = read_json_file(source)
+        if not isinstance(data, list):
+            raise ValueError(f"Источник для объединения не найден или повреждён: {source}")
+
+        source_ids = set()
+        for item in data:
+            if item['id'] in seen:
+                continue
+            merged.append(item)
+            source_ids.add(item['id'])
+        seen |= source_ids
+    return merged
+
+
+def merge_all(targets=None, records=None):
+    """Записывает все цели; возвращает {путь: 'changed' | 'unchanged' | 'error'}."""
+    targets = targets if targets is not None else load_targets()
+    report = {}
+    for output, sources in targets.items():
+        try:
+            merged = merge_sources(sources, records)
+        except ValueError as e:
+            # Как и mergeJson.js, при недоступном источнике цель не перезаписывается
+            logError(f"Файл {output} не объединён", str(e))
+            report[output] = 'error'
+            continue
+        report.update(save_json(merged, [output]))
+    return report
+
+
+def main():
+    try:
+        report = merge_all()
+        changed = sum(1 for status in report.values() if status == 'changed')
+        errors = sum(1 for status in report.values() if status == 'error')
+        print(f"Объединено файлов: {len(report)}, изменено: {changed}, ошибок: {errors}")
+    except Exception as e:
+        logError("Ошибка слияния файлов", str(e))
+    # save_json копит изменения моделей в changeset; при вызове из scrape_all его сохраняет scrape_all
+    changeset.save()
+    # Как и mergeJson.js, не прерываем workflow
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
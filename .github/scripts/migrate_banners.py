@@ -4,6 +4,8 @@ import sys
 from pathlib import Path
 from collections import OrderedDict
 
+from data_catalog import DataCatalog
+
 
 ROOT = Path("./")
 
@@ -129,13 +131,13 @@ def transform_data(data):
 
 
 def main():
-    base = ROOT / "src"
-    files = sorted(base.glob("**/banners.json"))
+    catalog = DataCatalog(ROOT / "src")
+    files = catalog.paths("banners.json")
 
     changed = []
     for path in files:
         try:
-            data = load_json(path)
+            data = catalog.load(path)
         except Exception as e:
             print(f"[WARN] Skip {path}: cannot parse JSON ({e})")
             continue
@@ -143,10 +145,8 @@ def main():
         new_data = transform_data(data)
 
         # Compute new formatted text without trailing spaces and compare to current file content
-        try:
-            current_text = path.read_text(encoding="utf-8")
-        except Exception:
-            current_text = ""
+        # (the catalog already holds the text it parsed, no second read)
+        current_text = catalog.read_text(path)
 
         new_text = json.dumps(new_data, ensure_ascii=False, indent=4, separators=(",", ": "))
         if current_text != new_text + ("\n" if not current_text.endswith("\n") else ""):
@@ -5,6 +5,8 @@ import base64
 import requests
 import subprocess
 
+from data_catalog import DataCatalog
+
 class bcolors:
     HEADER = '\033[95m'
     OKBLUE = '\033[94m'
@@ -120,19 +122,15 @@ def check_settings_files():
         'improve_offer_background': []
     }
 
-    for site_dir in os.listdir(settings_dir):
-        site_path = os.path.join(settings_dir, site_dir)
-        if not os.path.isdir(site_path):
-            continue
-
-        settings_file = os.path.join(site_path, 'data', 'settings.json')
-        if not os.path.exists(settings_file):
+    catalog = DataCatalog(settings_dir)
+    for site_dir in catalog.sites(with_data=False):
+        if 'settings.json' not in catalog.files(site_dir):
             missing_files.append(site_dir)
             continue
 
+        settings_file = catalog.path(site_dir, 'settings.json')
         try:
-            with open(settings_file, 'r', encoding='utf-8') as f:
-                settings = json.load(f)
+            settings = catalog.load(settings_file)
                 
             for key in missing_keys.keys():
                 if key not in settings:
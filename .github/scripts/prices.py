@@ -0,0 +1,22 @@
+"""
+Приведение цен и выгод к числам - общее для scrape.py (cars.json) и
+updateComplectationsPrices (complectations-prices.json).
+"""
+
+import re
+
+_PRICE_NOISE_RE = re.compile(r'[\s\u00a0\u202f₽]|руб\.?', re.IGNORECASE)
+
+
+def normalize_price(value, empty=None):
+    """
+    Приводит цену или выгоду к int: 2319000, "1699990", "1 699 990 ₽" -> число.
+    Пустое значение заменяется на empty; строки, которые не являются числом
+    (например, шаблоны {{benefit-...}}), возвращаются без изменений.
+    """
+    if value is None or value == '':
+        return empty
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    digits = _PRICE_NOISE_RE.sub('', str(value))
+    return int(digits) if digits.isdigit() else value
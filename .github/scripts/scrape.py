@@ -3,10 +3,19 @@ import json
 import os
 import re
 import time
-from lxml import html
+import atexit
+import hashlib
+import queue
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from lxml import etree, html
 import elementpath
 from elementpath.xpath3 import XPath3Parser
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -14,11 +23,84 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 
+import scrape_metrics
+from prices import normalize_price
+
 # Загрузка переменных окружения из .env файла
 load_dotenv()
 
+# Пул браузеров: сколько Chrome держать одновременно и через сколько страниц перезапускать
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', '2'))
+BROWSER_MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', '20'))
+
+# Что не загружать в браузере: категории из BROWSER_BLOCK_PATTERNS или свои шаблоны URL
+# через запятую; пустое значение отключает блокировку
+BROWSER_BLOCK = [item.strip() for item in os.getenv('BROWSER_BLOCK', 'images,media,fonts,trackers').split(',') if item.strip()]
+
+def _extension_patterns(*extensions):
+    """Шаблоны по расширению в конце пути: *.mov и *.mov?*, но не /movies/ или *.move.js."""
+    return tuple(pattern for extension in extensions for pattern in (f"*.{extension}", f"*.{extension}?*"))
+
+BROWSER_BLOCK_PATTERNS = {
+    'images': _extension_patterns('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'ico', 'bmp'),
+    'media': _extension_patterns('mp4', 'webm', 'ogg', 'ogv', 'mp3', 'm3u8', 'mov'),
+    'fonts': _extension_patterns('woff', 'woff2', 'ttf', 'otf', 'eot'),
+    'trackers': (
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+        '*mc.yandex.ru*', '*mc.yandex.com*', '*top-fwz1.mail.ru*', '*vk.com/rtrg*',
+        '*connect.facebook.net*', '*hotjar.com*', '*calltouch.ru*', '*callibri.ru*',
+        '*roistat.com*', '*comagic.ru*', '*jivosite.com*', '*code.jivo.ru*', '*envybox.io*',
+        '*carrotquest.io*', '*mango-office.ru*',
+    ),
+}
+# normal - ждать полной загрузки страницы, eager - только готовности DOM (DOMContentLoaded)
+BROWSER_PAGE_LOAD = os.getenv('BROWSER_PAGE_LOAD', 'normal')
+# Каталог постоянных профилей Chrome, по одному на браузер пула: cookies и согласия сайтов
+# переживают перезапуски, HTTP-кэш отключён. Пустое значение - временный профиль на каждый запуск
+BROWSER_PROFILE_DIR = os.getenv('BROWSER_PROFILE_DIR', '.cache/chrome-profile')
+
+# Как дожидаться результата клика: selector, dom, network или sleep (фиксированная пауза)
+AFTER_CLICK_STRATEGIES = ('selector', 'dom', 'network', 'sleep')
+AFTER_CLICK_DEFAULT = 'dom'
+AFTER_CLICK_TIMEOUT = 5
+# Сколько секунд DOM или сеть должны простоять без изменений, чтобы считать клик завершённым
+AFTER_CLICK_QUIET = 0.5
+# Пауза стратегии sleep, как фиксированная пауза после клика до стратегий ожидания
+AFTER_CLICK_SLEEP = 2
+
+# Каталог для ETag/Last-Modified прошлых запусков; пустое значение отключает условные запросы
+SCRAPE_CACHE_DIR = os.getenv('SCRAPE_CACHE_DIR', '.cache/scrape')
+
+# Результат загрузки, когда сервер ответил 304 Not Modified
+NOT_MODIFIED = object()
+
+# Хэши HTML и извлечённых данных прошлого запуска по брендам; пустое значение отключает проверку
+SCRAPE_STATE_PATH = os.getenv('SCRAPE_STATE_PATH', '.cache/scrape-state.json')
+
+# Результат scrape_page, когда данные бренда не изменились и записывать нечего
+UNCHANGED = object()
+
+# Сводка изменений моделей за запуск: добавленные, удалённые, изменившиеся цены и ссылки
+# по каждому записанному файлу; пустое значение отключает
+SCRAPE_CHANGESET_PATH = os.getenv('SCRAPE_CHANGESET', '.cache/scrape-changes.json')
+
+# Офлайн-режим: SCRAPE_RECORD_DIR - сохранять загруженные страницы в каталог фикстур,
+# SCRAPE_REPLAY_DIR - брать страницы из каталога фикстур вместо сети и браузера
+SCRAPE_RECORD_DIR = os.getenv('SCRAPE_RECORD_DIR', '')
+SCRAPE_REPLAY_DIR = os.getenv('SCRAPE_REPLAY_DIR', '')
+
+# Разбирать HTML по мере загрузки (для брендов без клика); размер читаемого куска в байтах
+SCRAPE_STREAM = os.getenv('SCRAPE_STREAM', '') == '1'
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Листинги из нескольких страниц: сколько страниц с одного хоста загружать одновременно
+# и сколько страниц максимум проходить по next_page_xpath
+SCRAPE_PAGES_PER_HOST = int(os.getenv('SCRAPE_PAGES_PER_HOST', '2'))
+SCRAPE_MAX_PAGES = int(os.getenv('SCRAPE_MAX_PAGES', '20'))
+
 def logError(message, errorText):
     print(f"{message}: {errorText}")
     with open('output.txt', 'a') as file:
@@ -31,6 +113,60 @@ def process_xpath_result(result):
         return [item.strip() for item in result if item.strip()][0]
     return result.strip() if result else None
 
+class XPathSelector:
+    """
+    XPath выражение, скомпилированное один раз.
+
+    Выражения XPath 1.0 выполняются нативным движком lxml, остальные (например,
+    с replace()) - через elementpath с XPath 3.0. Функции XPath 2.0+ lxml
+    компилирует, но не может вычислить, поэтому при первой такой ошибке
+    выражение навсегда переключается на elementpath.
+    """
+
+    def __init__(self, expression, parser=XPath3Parser, engine='auto'):
+        self.expression = expression
+        self.parser = parser
+        self.engine = 'elementpath'
+        self._elementpath = None
+        # Скомпилированные etree.XPath храним по потокам: сами объекты не потокобезопасны
+        self._local = threading.local()
+
+        if engine in ('auto', 'lxml'):
+            try:
+                etree.XPath(expression)
+                self.engine = 'lxml'
+            except etree.XPathSyntaxError:
+                if engine == 'lxml':
+                    raise
+
+    def select(self, node):
+        if self.engine == 'lxml':
+            try:
+                return self._lxml_xpath()(node)
+            except etree.XPathEvalError:
+                self.engine = 'elementpath'
+        return self._elementpath_selector().select(node)
+
+    def _lxml_xpath(self):
+        xpath = getattr(self._local, 'xpath', None)
+        if xpath is None:
+            xpath = self._local.xpath = etree.XPath(self.expression)
+        return xpath
+
+    def _elementpath_selector(self):
+        if self._elementpath is None:
+            self._elementpath = elementpath.Selector(self.expression, parser=self.parser)
+        return self._elementpath
+
+@lru_cache(maxsize=None)
+def compile_xpath(expression, parser=XPath3Parser, engine='auto'):
+    """
+    Компилирует XPath выражение один раз и кэширует его по тексту, парсеру и движку.
+    engine: 'auto' - lxml для XPath 1.0 и elementpath для остального,
+    'elementpath' - только elementpath, 'lxml' - только lxml.
+    """
+    return XPathSelector(expression, parser=parser, engine=engine)
+
 def clean_string(text, word_to_remove):
     # Удаляем все вхождения определённого слова (регистрозависимое удаление)
     cleaned = re.sub(word_to_remove, '', text, flags=re.IGNORECASE)
@@ -50,24 +186,685 @@ def read_json_file(file_path):
         logError("Ошибка при чтении файла", e)
         return None
 
+def atomic_write(file_path, payload):
+    """Записывает bytes через временный файл и rename, чтобы файл не остался записанным наполовину."""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def read_file_bytes(file_path):
+    """Содержимое файла или None, если его нет."""
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _model_keys(data):
+    """Ключ модели для сравнения: id, а если id в файле повторяется (комплектации) - id и название."""
+    counts = {}
+    for item in data:
+        counts[item.get('id')] = counts.get(item.get('id'), 0) + 1
+    return {
+        (item.get('id') if counts[item.get('id')] == 1 else f"{item.get('id')}|{item.get('model')}"): item
+        for item in data
+    }
+
+def diff_models(old, new):
+    """Изменения между двумя версиями cars.json: added, removed, price_changed, link_changed."""
+    old_by_key = _model_keys(old)
+    new_by_key = _model_keys(new)
+    changes = {
+        'added': [new_by_key[key] for key in new_by_key if key not in old_by_key],
+        'removed': [old_by_key[key] for key in old_by_key if key not in new_by_key],
+        'price_changed': [],
+        'link_changed': [],
+    }
+    for key, item in new_by_key.items():
+        previous = old_by_key.get(key)
+        if previous is None:
+            continue
+        for field in ('price', 'link'):
+            old_value, new_value = previous.get(field), item.get(field)
+            if field == 'price':
+                # Старые файлы могут хранить цену строкой: "1699990" и 1699990 - одна цена
+                old_value, new_value = normalize_price(old_value), normalize_price(new_value)
+            if old_value != new_value:
+                changes[f"{field}_changed"].append({
+                    'id': item.get('id'),
+                    'model': item.get('model'),
+                    'old': old_value,
+                    'new': new_value,
+                })
+    return changes if any(changes.values()) else None
+
+class Changeset:
+    """
+    Изменения моделей за один запуск по всем записанным файлам.
+    Запуски отдельных брендов с одинаковым SCRAPE_RUN_ID дописывают изменения
+    в один файл, иначе файл начинается заново (в том числе пустым, чтобы не
+    осталось изменений прошлого запуска).
+    """
+
+    def __init__(self, path=SCRAPE_CHANGESET_PATH, run_id=None):
+        self.path = path
+        self.run_id = run_id or os.getenv('SCRAPE_RUN_ID') or time.strftime('%Y%m%d-%H%M%S')
+        self.targets = {}
+        self._lock = threading.Lock()
+
+    def add(self, file_path, previous, data):
+        """previous - прежнее содержимое файла в байтах (None, если файла не было)."""
+        try:
+            old = json.loads(previous) if previous else []
+        except ValueError:
+            old = []
+        changes = diff_models(old, data)
+        if changes:
+            with self._lock:
+                self.targets[file_path] = changes
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            targets = {}
+            existing = read_json_file(self.path) if os.path.exists(self.path) else None
+            if existing and existing.get('run') == self.run_id:
+                targets.update(existing.get('targets', {}))
+            targets.update(self.targets)
+            payload = {
+                'run': self.run_id,
+                'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'targets': targets,
+            }
+            try:
+                atomic_write(self.path, json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8'))
+                print(f"Изменения моделей: {self.path}")
+            except OSError as e:
+                logError("Ошибка при сохранении изменений", f"{self.path}: {e}")
+
+changeset = Changeset()
+
+def serialize_records(data):
+    """Байты файла cars.json для списка моделей; по их хэшу scrape_page сверяет записанные файлы."""
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+def outputs_match(file_paths, records_hash):
+    """Все выходные файлы бренда на месте и содержат данные с хэшем records_hash."""
+    if not records_hash:
+        return False
+    for file_path in file_paths or ():
+        content = read_file_bytes(file_path)
+        if content is None or content_hash(content) != records_hash:
+            return False
+    return True
+
 def save_json(data, file_paths, brand_prefix=None):
+    """
+    Сохраняет данные во все файлы из file_paths.
+
+    JSON сериализуется один раз; каждый файл перезаписывается атомарно и только
+    если его содержимое отличается. Изменения моделей попадают в changeset.
+
+    Returns:
+        dict: путь -> 'changed', 'unchanged' или 'error'
+    """
+    metrics = scrape_metrics.current()
+    started = time.perf_counter()
+    payload = serialize_records(data)
+    report = {}
+
     for file_path in file_paths:
         try:
-            directory = os.path.dirname(file_path)
-            dealer_data = data.copy()
-
-            # Создаем директорию, если её нет
-            os.makedirs(directory, exist_ok=True)
-            
-            # Сохраняем данные
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(dealer_data, f, ensure_ascii=False, indent=2)
-            
-            print(f"Данные успешно сохранены в файл: {file_path}")
+            previous = read_file_bytes(file_path)
+            if previous != payload:
+                atomic_write(file_path, payload)
+                changeset.add(file_path, previous, data)
+                report[file_path] = 'changed'
+                print(f"Данные успешно сохранены в файл: {file_path}")
+            else:
+                report[file_path] = 'unchanged'
+                print(f"Файл не изменился: {file_path}")
         except Exception as e:
+            report[file_path] = 'error'
             logError(f"Ошибка при сохранении файла", f"{file_path}: {e}")
 
-def load_page(url, click_selector=None, wait_selector=None, wait_time=1):
+    metrics.add_time('write', time.perf_counter() - started)
+    return report
+
+_driver_path_lock = threading.Lock()
+
+def get_driver_path():
+    """
+    Путь к chromedriver определяется один раз за запуск.
+    CHROMEDRIVER_PATH позволяет указать уже установленный драйвер и не обращаться к сети.
+    """
+    with _driver_path_lock:
+        return _resolve_driver_path()
+
+@lru_cache(maxsize=None)
+def _resolve_driver_path():
+    return os.getenv('CHROMEDRIVER_PATH') or ChromeDriverManager().install()
+
+def create_driver(profile_dir=None):
+    # Настройка опций Chrome
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")  # Безголовый режим
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    # Всё, что не нужно для чтения страницы: расширения, фоновые запросы, синхронизация, звук
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-background-networking")
+    chrome_options.add_argument("--disable-component-update")
+    chrome_options.add_argument("--disable-default-apps")
+    chrome_options.add_argument("--disable-sync")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument("--disable-features=Translate,MediaRouter,OptimizationHints")
+    # Без дискового кэша: иначе постоянный профиль отдаст HTML и XHR прошлого запуска со старыми ценами
+    chrome_options.add_argument("--disk-cache-size=0")
+    chrome_options.page_load_strategy = BROWSER_PAGE_LOAD
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+
+    service = Service(get_driver_path())
+    return webdriver.Chrome(service=service, options=chrome_options)
+
+class BrowserPool:
+    """
+    Пул долгоживущих сессий Chrome для страниц с кликами.
+
+    Одна сессия WebDriver не потокобезопасна, поэтому каждая задача получает
+    сессию целиком и работает в новой вкладке, которая закрывается после неё.
+    Одновременно живёт не больше `size` браузеров; браузер перезапускается
+    после `max_pages` страниц или после ошибки.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_pages=BROWSER_MAX_PAGES, profile_dir=BROWSER_PROFILE_DIR):
+        self.max_pages = max_pages
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        # Два Chrome не могут работать с одним профилем, поэтому у каждого места в пуле свой каталог
+        self._profiles = queue.Queue()
+        for index in range(size):
+            self._profiles.put(os.path.join(profile_dir, str(index)) if profile_dir else None)
+        self._driver_profiles = {}
+
+    @contextmanager
+    def page(self):
+        with self._slots:
+            try:
+                driver, pages = self._idle.get_nowait()
+            except queue.Empty:
+                profile = self._profiles.get_nowait()
+                with scrape_metrics.current().stage('driver_startup'):
+                    try:
+                        driver, pages = create_driver(profile), 0
+                    except BaseException:
+                        self._profiles.put(profile)
+                        raise
+                self._driver_profiles[id(driver)] = profile
+
+            healthy = False
+            try:
+                driver.switch_to.new_window('tab')
+                yield driver
+                healthy = True
+            finally:
+                pages += 1
+                try:
+                    # Закрываем вкладку задачи и возвращаемся на исходную
+                    driver.close()
+                    driver.switch_to.window(driver.window_handles[0])
+                except Exception:
+                    healthy = False
+
+                if healthy and pages < self.max_pages:
+                    self._idle.put((driver, pages))
+                else:
+                    self._quit(driver)
+
+    def close(self):
+        while True:
+            try:
+                driver, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(driver)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logError("Ошибка при закрытии WebDriver", e)
+        finally:
+            self._profiles.put(self._driver_profiles.pop(id(driver), None))
+
+browser_pool = BrowserPool()
+atexit.register(browser_pool.close)
+
+def browser_block_patterns(allow=None):
+    """
+    Шаблоны URL для блокировки в браузере. allow - правила бренда: имя категории
+    (images, media, fonts, trackers) снимает её целиком, шаблон - только его.
+    """
+    allow = set(allow or ())
+    patterns = []
+    for category in BROWSER_BLOCK:
+        if category in allow:
+            continue
+        patterns.extend(pattern for pattern in BROWSER_BLOCK_PATTERNS.get(category, (category,)) if pattern not in allow)
+    return patterns
+
+def block_resources(driver, allow=None):
+    """Отключает HTTP-кэш и включает блокировку ресурсов через DevTools для текущей вкладки."""
+    patterns = browser_block_patterns(allow)
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': True})
+        if patterns:
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except Exception as e:
+        logError("Не удалось включить блокировку ресурсов", str(e))
+
+class StreamedPage:
+    """Результат потоковой загрузки: прочитанные байты, уже разобранное дерево и признак полной загрузки."""
+
+    __slots__ = ('content', 'tree', 'complete')
+
+    def __init__(self, content, tree, complete):
+        self.content = content
+        self.tree = tree
+        self.complete = complete
+
+def stream_parse(response, stop_selector=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Скармливает тело ответа pull-парсеру lxml по мере поступления.
+
+    После каждого куска проверяет stop_selector на уже разобранной части
+    дерева: если найденный элемент закрылся (парсер выдал для него событие
+    end), остальная часть ответа не читается. Время feed() пишется в этап
+    parse, остальное время чтения - в download.
+    """
+    metrics = scrape_metrics.current()
+    # События нужны только для проверки stop_selector, без него хватает обычного feed()
+    if stop_selector is not None:
+        parser = etree.HTMLPullParser(events=('start', 'end'))
+    else:
+        parser = etree.HTMLParser()
+    parser.set_element_class_lookup(html.HtmlElementClassLookup())
+    chunks = []
+    root = None
+    ended = set()
+    complete = True
+    parse_seconds = 0.0
+    started = time.perf_counter()
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            chunks.append(chunk)
+            feed_started = time.perf_counter()
+            parser.feed(chunk)
+            stop = False
+            if stop_selector is not None:
+                for event, element in parser.read_events():
+                    if root is None and event == 'start':
+                        root = element
+                    elif event == 'end':
+                        ended.add(element)
+                stop = root is not None and any(
+                    node in ended for node in stop_selector.select(root) if isinstance(node, etree._Element)
+                )
+            parse_seconds += time.perf_counter() - feed_started
+            if stop:
+                complete = False
+                break
+        feed_started = time.perf_counter()
+        tree = parser.close()
+        parse_seconds += time.perf_counter() - feed_started
+    finally:
+        response.close()
+
+    content = b''.join(chunks)
+    metrics.add_time('parse', parse_seconds)
+    metrics.add_time('download', time.perf_counter() - started - parse_seconds)
+    metrics.set('bytes', len(content))
+    if not complete:
+        metrics.set('stream_stopped', True)
+        print(f"Нужная часть страницы получена, чтение остановлено после {len(content)} байт")
+    return StreamedPage(content, tree, complete)
+
+class HttpFetcher:
+    """
+    Общий слой загрузки по HTTP.
+
+    Использует один requests.Session с пулом keep-alive соединений и при
+    conditional=True отправляет условный запрос с ETag/Last-Modified прошлого
+    запуска. Если сервер ответил 304, возвращает NOT_MODIFIED. Новые валидаторы
+    попадают на диск только через commit_validators - после того, как данные
+    страницы успешно записаны, иначе 304 скрыл бы незаписанные изменения.
+    Один и тот же URL за запуск загружается только один раз, даже если его
+    запросили несколько брендов параллельно.
+    """
+
+    def __init__(self, cache_dir=SCRAPE_CACHE_DIR, timeout=30):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.verify = False
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        user_agent = os.getenv('USER_AGENT')
+        if user_agent:
+            self.session.headers['User-Agent'] = user_agent
+        self._lock = threading.Lock()
+        self._results = {}
+        self._resolved_hosts = set()
+        # URL -> ETag/Last-Modified последнего ответа 200, ещё не сохранённые на диск
+        self._pending_validators = {}
+
+    def get(self, url, conditional=True):
+        """Возвращает тело ответа (bytes), NOT_MODIFIED или пустую строку при ошибке."""
+        # Условный и безусловный запросы к одному URL не подменяют друг друга:
+        # бренду без сохранённого состояния ответ 304 не подходит
+        key = (url, conditional)
+        with self._lock:
+            entry = self._results.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._results[key] = {'done': threading.Event(), 'result': ""}
+
+        if owner:
+            try:
+                entry['result'] = self._fetch(url, conditional)
+            finally:
+                entry['done'].set()
+                # Неудачную загрузку не запоминаем, чтобы повтор бренда сходил в сеть заново
+                if not entry['result']:
+                    with self._lock:
+                        self._results.pop(key, None)
+        else:
+            print(f"Страница {url} уже загружена в этом запуске")
+            scrape_metrics.current().set('shared_fetch', True)
+            entry['done'].wait()
+        return entry['result']
+
+    def get_streamed(self, url, stop_selector=None, conditional=True):
+        """
+        Загружает страницу кусками и сразу разбирает их lxml pull-парсером.
+        Если задан stop_selector, чтение прекращается, как только закрылся
+        найденный им элемент (например, меню моделей в шапке), а дальнейшая
+        часть страницы не скачивается. Возвращает StreamedPage, NOT_MODIFIED
+        или пустую строку при ошибке. В общий кэш get() результат не попадает:
+        при ранней остановке в нём только начало страницы.
+        """
+        try:
+            response = self._open(url, self._conditional_headers(url) if conditional else None)
+            if response.status_code == 304:
+                response.close()
+                print(f"Страница не изменилась (304): {url}")
+                return NOT_MODIFIED
+            self._check_status(url, response)
+
+            page = stream_parse(response, stop_selector)
+            self._save_validators(url, response)
+            return page
+        except Exception as e:
+            logError("Ошибка при потоковой загрузке страницы", str(e))
+            return ""
+
+    def get_fresh(self, url):
+        """Безусловная загрузка через общий пул соединений, без кэша."""
+        return self._timed_get(url)[1]
+
+    def forget(self):
+        """Забывает загруженные в этом запуске страницы: повтор брендов загрузит их заново."""
+        with self._lock:
+            self._results.clear()
+
+    def _timed_get(self, url, headers=None):
+        """
+        GET с записью метрик: dns (первое разрешение хоста за запуск), connect_ttfb
+        (соединение и ожидание заголовков), download (чтение тела) и bytes.
+        """
+        metrics = scrape_metrics.current()
+        response = self._open(url, headers)
+        self._check_status(url, response)
+        with metrics.stage('download'):
+            content = response.content
+        metrics.set('bytes', len(content))
+        return response, content
+
+    def _open(self, url, headers=None):
+        """Отправляет запрос и дожидается заголовков ответа; тело читает вызывающий."""
+        metrics = scrape_metrics.current()
+        parsed = urlparse(url)
+        if parsed.hostname and parsed.hostname not in self._resolved_hosts:
+            self._resolved_hosts.add(parsed.hostname)
+            with metrics.stage('dns'):
+                try:
+                    socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80))
+                except OSError:
+                    pass
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+        metrics.add_time('connect_ttfb', response.elapsed.total_seconds())
+        return response
+
+    def _check_status(self, url, response):
+        """Ответ 4xx/5xx - ошибка загрузки: такая страница не разбирается и не запоминается на запуск."""
+        if response.status_code >= 400:
+            response.close()
+            raise requests.HTTPError(f"HTTP {response.status_code}: {url}", response=response)
+
+    def _conditional_headers(self, url):
+        meta = self._read_meta(url)
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def _save_validators(self, url, response):
+        with self._lock:
+            self._pending_validators[url] = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+
+    def commit_validators(self, urls):
+        """Сохраняет валидаторы загруженных страниц; вызывается после успешной записи их данных."""
+        for url in urls:
+            with self._lock:
+                meta = self._pending_validators.pop(url, None)
+            if meta:
+                self._write_meta(url, meta)
+
+    def _fetch(self, url, conditional=True):
+        try:
+            response, content = self._timed_get(url, self._conditional_headers(url) if conditional else None)
+            if response.status_code == 304:
+                print(f"Страница не изменилась (304): {url}")
+                return NOT_MODIFIED
+
+            self._save_validators(url, response)
+            return content
+        except Exception as e:
+            logError("Ошибка при загрузке страницы через requests", str(e))
+            return ""
+
+    def _meta_path(self, url):
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _read_meta(self, url):
+        if not self.cache_dir:
+            return {}
+        try:
+            with open(self._meta_path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, url, meta):
+        if not self.cache_dir or not (meta['etag'] or meta['last_modified']):
+            return
+        try:
+            payload = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+            atomic_write(self._meta_path(url), payload)
+        except OSError as e:
+            logError("Ошибка при сохранении кэша запросов", f"{url}: {e}")
+
+http_fetcher = HttpFetcher()
+
+# Ждёт, пока DOM не будет меняться quietMs миллисекунд, но не дольше timeoutMs
+_DOM_QUIET_SCRIPT = """
+const [quietMs, timeoutMs, done] = arguments;
+let quietTimer;
+const finish = (result) => {
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(hardTimer);
+    done(result);
+};
+const observer = new MutationObserver(() => {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(() => finish(true), quietMs);
+});
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+quietTimer = setTimeout(() => finish(true), quietMs);
+const hardTimer = setTimeout(() => finish(false), timeoutMs);
+"""
+
+# Считает незавершённые fetch/XHR запросы страницы в window.__scrapeInflight
+_NETWORK_TRACKER_SCRIPT = """
+if (window.__scrapeInflight === undefined) {
+    window.__scrapeInflight = 0;
+    const originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function() {
+            window.__scrapeInflight++;
+            return originalFetch.apply(this, arguments).finally(() => window.__scrapeInflight--);
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        window.__scrapeInflight++;
+        this.addEventListener('loadend', () => window.__scrapeInflight--);
+        return originalSend.apply(this, arguments);
+    };
+}
+"""
+
+def prepare_after_click(driver, strategy):
+    """Вызывается до клика: для стратегии network начинает считать запросы страницы."""
+    if strategy == 'network':
+        driver.execute_script(_NETWORK_TRACKER_SCRIPT)
+
+def wait_after_click(driver, strategy=AFTER_CLICK_DEFAULT, selector=None, timeout=AFTER_CLICK_TIMEOUT):
+    """
+    Дожидается результата клика выбранной стратегией, но не дольше timeout секунд.
+
+    selector - появление элемента after_click_selector;
+    dom      - DOM не меняется AFTER_CLICK_QUIET секунд;
+    network  - нет незавершённых fetch/XHR AFTER_CLICK_QUIET секунд;
+    sleep    - фиксированная пауза AFTER_CLICK_SLEEP секунд, но не дольше timeout
+               (старое поведение).
+
+    Returns:
+        dict: strategy, seconds, completed (False, если сработал таймаут)
+    """
+    if strategy == 'selector' and not selector:
+        strategy = 'dom'
+
+    started = time.monotonic()
+    completed = True
+
+    if strategy == 'selector':
+        try:
+            WebDriverWait(driver, timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+            )
+        except TimeoutException:
+            completed = False
+    elif strategy == 'dom':
+        driver.set_script_timeout(timeout + 1)
+        completed = bool(driver.execute_async_script(
+            _DOM_QUIET_SCRIPT, int(AFTER_CLICK_QUIET * 1000), int(timeout * 1000)
+        ))
+    elif strategy == 'network':
+        deadline = started + timeout
+        quiet_since = None
+        completed = False
+        while time.monotonic() < deadline:
+            if driver.execute_script("return window.__scrapeInflight || 0") == 0:
+                quiet_since = quiet_since or time.monotonic()
+                if time.monotonic() - quiet_since >= AFTER_CLICK_QUIET:
+                    completed = True
+                    break
+            else:
+                quiet_since = None
+            time.sleep(0.1)
+    else:
+        time.sleep(min(AFTER_CLICK_SLEEP, timeout))
+
+    result = {
+        'strategy': strategy,
+        'seconds': round(time.monotonic() - started, 3),
+        'completed': completed,
+    }
+    print(f"Ожидание после клика ({strategy}): {result['seconds']}s" + ("" if completed else ", таймаут"))
+    metrics = scrape_metrics.current()
+    metrics.add_time('after_click', result['seconds'])
+    metrics.set('after_click', result)
+    return result
+
+def fixture_path(directory, url, click_selector=None):
+    """
+    Путь к сохранённой странице: имя строится из хоста и пути URL,
+    страница после клика хранится отдельно с суффиксом .click.html
+    """
+    parsed = urlparse(url)
+    name = re.sub(r'[^A-Za-z0-9]+', '-', parsed.netloc + parsed.path).strip('-')
+    return os.path.join(directory, name + ('.click.html' if click_selector else '.html'))
+
+def read_fixture(url, click_selector=None, directory=None):
+    path = fixture_path(directory or SCRAPE_REPLAY_DIR, url, click_selector)
+    print(f"Загрузка страницы из фикстуры {path}")
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError as e:
+        logError("Ошибка чтения фикстуры", f"{path}: {e}")
+        return ""
+
+def write_fixture(url, page_content, click_selector=None, directory=None):
+    path = fixture_path(directory or SCRAPE_RECORD_DIR, url, click_selector)
+    if isinstance(page_content, str):
+        page_content = page_content.encode('utf-8')
+    try:
+        atomic_write(path, page_content)
+        print(f"Страница сохранена в фикстуру {path}")
+    except OSError as e:
+        logError("Ошибка записи фикстуры", f"{path}: {e}")
+
+def load_page(url, click_selector=None, wait_selector=None, wait_time=1,
+              after_click=AFTER_CLICK_DEFAULT, after_click_selector=None, after_click_timeout=AFTER_CLICK_TIMEOUT,
+              stream=False, stream_until=None, browser_allow=None, conditional=True):
     """
     Загружает страницу с помощью requests или Selenium WebDriver в зависимости от параметров
     
@@ -76,141 +873,575 @@ def load_page(url, click_selector=None, wait_selector=None, wait_time=1):
         click_selector (str, optional): CSS селектор для элемента, на который нужно кликнуть
         wait_selector (str, optional): CSS селектор элемента, появление которого нужно дождаться
         wait_time (int, optional): Время ожидания в секундах
+        after_click (str, optional): Стратегия ожидания после клика, см. wait_after_click
+        after_click_selector (str, optional): CSS селектор для стратегии selector
+        after_click_timeout (float, optional): Максимальное ожидание после клика в секундах
+        stream (bool, optional): Разбирать HTML по мере загрузки (только без клика)
+        stream_until (str, optional): XPath области страницы, после закрытия которой чтение прекращается
+        browser_allow (list, optional): Что не блокировать в браузере, см. browser_block_patterns
+        conditional (bool, optional): Условный запрос по валидаторам прошлого запуска
         
     Returns:
-        str: HTML содержимое страницы
+        str: HTML содержимое страницы, StreamedPage при потоковой загрузке
+             или NOT_MODIFIED, если сервер ответил 304
     """
+    # Офлайн-прогон: сеть и браузер не используются
+    if SCRAPE_REPLAY_DIR:
+        return read_fixture(url, click_selector)
+
+    page_content = _load_page_live(
+        url, click_selector, wait_selector, wait_time,
+        after_click=after_click,
+        after_click_selector=after_click_selector,
+        after_click_timeout=after_click_timeout,
+        stream=stream,
+        stream_until=stream_until,
+        browser_allow=browser_allow,
+        conditional=conditional,
+    )
+    if SCRAPE_RECORD_DIR and page_content and page_content is not NOT_MODIFIED:
+        if isinstance(page_content, StreamedPage):
+            write_fixture(url, page_content.content, click_selector)
+        else:
+            write_fixture(url, page_content, click_selector)
+    return page_content
+
+def _load_page_live(url, click_selector=None, wait_selector=None, wait_time=1,
+                    after_click=AFTER_CLICK_DEFAULT, after_click_selector=None, after_click_timeout=AFTER_CLICK_TIMEOUT,
+                    stream=False, stream_until=None, browser_allow=None, conditional=True):
     # Если нужно кликнуть, используем Selenium
     if click_selector:
         print(f"Загрузка страницы через WebDriver с кликом на {click_selector}")
         
-        # Настройка опций Chrome
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Безголовый режим
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        
-        # Создаем экземпляр драйвера
         try:
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # Загружаем страницу
-            driver.get(url)
-            print("Страница загружена")
-            
-            # Ждем если указан селектор ожидания
-            if wait_selector:
-                print(f"Ожидание элемента {wait_selector}")
-                WebDriverWait(driver, wait_time).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector))
-                )
-            
-            # Кликаем на элемент
-            print(f"Выполнение клика на элемент {click_selector}")
-            try:
-                element = WebDriverWait(driver, wait_time).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, click_selector))
-                )
-                element.click()
-                print("Клик выполнен успешно")
+            with browser_pool.page() as driver:
+                block_resources(driver, browser_allow)
+
+                # Загружаем страницу
+                with scrape_metrics.current().stage('browser_load'):
+                    driver.get(url)
+                print("Страница загружена")
+                
+                # Ждем если указан селектор ожидания
+                if wait_selector:
+                    print(f"Ожидание элемента {wait_selector}")
+                    WebDriverWait(driver, wait_time).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector))
+                    )
                 
-                # Дополнительное ожидание после клика
-                time.sleep(2)
-            except Exception as e:
-                logError(f"Ошибка при клике", e)
-                # Можно также попробовать альтернативный метод клика через JavaScript
+                # Кликаем на элемент
+                print(f"Выполнение клика на элемент {click_selector}")
+                prepare_after_click(driver, after_click)
+                clicked = False
                 try:
-                    driver.execute_script(f"document.querySelector('{click_selector}').click();")
-                    print("Клик выполнен через JavaScript")
-                    time.sleep(2)
-                except Exception as js_e:
-                    logError(f"Ошибка при клике через JavaScript", js_e)
-            
-            # Получаем HTML после всех действий
-            html_content = driver.page_source
-            driver.quit()
-            return html_content
+                    element = WebDriverWait(driver, wait_time).until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, click_selector))
+                    )
+                    element.click()
+                    clicked = True
+                    print("Клик выполнен успешно")
+                except Exception as e:
+                    logError(f"Ошибка при клике", e)
+                    # Можно также попробовать альтернативный метод клика через JavaScript
+                    try:
+                        driver.execute_script(f"document.querySelector('{click_selector}').click();")
+                        clicked = True
+                        print("Клик выполнен через JavaScript")
+                    except Exception as js_e:
+                        logError(f"Ошибка при клике через JavaScript", js_e)
+
+                # Ждём завершения действий, вызванных кликом. Ожидание вне try клика:
+                # повторный клик после таймаута закрыл бы раскрытое меню или аккордеон
+                if clicked:
+                    try:
+                        wait_after_click(driver, after_click, after_click_selector, after_click_timeout)
+                    except Exception as e:
+                        logError(f"Ошибка при ожидании после клика", e)
+                
+                # Получаем HTML после всех действий
+                return driver.page_source
             
         except Exception as e:
             logError(f"Ошибка при использовании WebDriver", e)
-            if 'driver' in locals():
-                driver.quit()
             # Если не получилось через WebDriver, пробуем через requests
             print("Переключение на загрузку через requests")
             try:
-                response = requests.get(url, timeout=30, verify=False)
-                return response.content
+                return http_fetcher.get_fresh(url)
             except Exception as requests_e:
                 logError("Ошибка при fallback к requests", str(requests_e))
                 return ""
     
+    # Разбор по мере загрузки: дерево строится параллельно с чтением ответа
+    if stream or stream_until:
+        print(f"Загрузка страницы через requests с разбором по мере загрузки")
+        return http_fetcher.get_streamed(url, compile_xpath(stream_until) if stream_until else None, conditional)
+
     # По умолчанию используем requests
     print(f"Загрузка страницы через requests")
-    try:
-        response = requests.get(url, timeout=30, verify=False)  # Добавляем timeout и отключаем SSL verification
-        return response.content
-    except Exception as e:
-        logError("Ошибка при загрузке страницы через requests", str(e))
-        return ""
+    return http_fetcher.get(url, conditional)
 
-def scrape_page(url, xpaths, brand_prefix):
-    try:
-        # Получаем параметры для кликов из переменных окружения
-        click_selector = os.getenv('CLICK_SELECTOR')
-        wait_selector = os.getenv('WAIT_SELECTOR')
-        wait_time = int(os.getenv('WAIT_TIME', '1'))
-        
-        # Загружаем страницу
-        page_content = load_page(url, click_selector, wait_selector, wait_time)
-        
-        # Если страница не загрузилась, возвращаем пустой список
-        if not page_content:
-            print("Страница не загрузилась, возвращаем пустой список")
-            return []
-        
-        # Парсим HTML с помощью lxml
-        tree = html.fromstring(page_content)
-        
-        data = []
-        
-        # Используем elementpath для выполнения XPath 3.0 запроса
-        items = elementpath.select(tree, xpaths['item_xpath'], parser=XPath3Parser)
-        
+# Скрипты, стили и комментарии часто меняются от запроса к запросу (nonce, метки времени)
+# и не влияют на извлекаемые модели, поэтому в хэш страницы не входят
+_VOLATILE_HTML_RE = re.compile(rb'<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->', re.S | re.I)
+_WHITESPACE_RE = re.compile(rb'\s+')
+
+def content_hash(value):
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return hashlib.sha256(value).hexdigest()
+
+def normalize_html(page_content):
+    if isinstance(page_content, str):
+        page_content = page_content.encode('utf-8')
+    page_content = _VOLATILE_HTML_RE.sub(b'', page_content)
+    return _WHITESPACE_RE.sub(b' ', page_content).strip()
+
+class ScrapeState:
+    """
+    Небольшое хранилище состояния между запусками: для каждого бренда хэш
+    нормализованного HTML, хэш конфигурации XPath и хэш извлечённых данных.
+    """
+
+    def __init__(self, path=SCRAPE_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+        # Ключ -> (страницы, новые хэши) этого запуска до подтверждения записи (commit)
+        self._pending = {}
+
+    def get(self, key):
+        with self._lock:
+            return dict(self._load().get(key, {}))
+
+    def update(self, key, **values):
+        if not self.path:
+            return
+        with self._lock:
+            self._load()[key] = values
+            try:
+                payload = json.dumps(self._data, ensure_ascii=False, indent=2).encode('utf-8')
+                atomic_write(self.path, payload)
+            except OSError as e:
+                logError("Ошибка при сохранении состояния скрапинга", f"{self.path}: {e}")
+
+    def stage(self, key, pages, **values):
+        """Откладывает обновление ключа до commit: хэши записываются, только когда записаны данные."""
+        with self._lock:
+            self._pending[key] = (list(pages), values)
+
+    def commit(self, key):
+        """Сохраняет отложенные хэши ключа; возвращает его страницы."""
+        with self._lock:
+            pages, values = self._pending.pop(key, ([], None))
+        if values:
+            self.update(key, **values)
+        return pages
+
+    def _load(self):
+        if self._data is None:
+            self._data = {}
+            if self.path and os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._data = json.load(f)
+                except (OSError, ValueError) as e:
+                    logError("Ошибка при чтении состояния скрапинга", f"{self.path}: {e}")
+        return self._data
+
+scrape_state = ScrapeState()
+
+def default_state_key(brand_prefix, url):
+    """Ключ состояния одиночного запуска без имени бренда из манифеста."""
+    return f"{brand_prefix}|{url}"
+
+def commit_scrape(state_key):
+    """
+    Подтверждает результат scrape_page после успешной записи файлов бренда:
+    сохраняет хэши HTML, конфигурации и данных и ETag/Last-Modified его страниц
+    для следующих запусков.
+    """
+    http_fetcher.commit_validators(scrape_state.commit(state_key))
+
+def extract_data(page_content, url, xpaths, brand_prefix, tree=None):
+    """
+    Извлекает модели из HTML страницы по XPath выражениям бренда.
+    Выражения компилируются один раз за запуск (см. compile_xpath).
+    Если дерево уже построено при потоковой загрузке, оно передаётся в tree.
+    """
+    metrics = scrape_metrics.current()
+
+    # Парсим HTML с помощью lxml
+    if tree is None:
+        with metrics.stage('parse'):
+            tree = html.fromstring(page_content)
+
+    selectors = {key: compile_xpath(expression) for key, expression in xpaths.items()}
+
+    def select(key, node):
+        started = time.perf_counter()
+        result = selectors[key].select(node)
+        metrics.add_time(f"xpath.{key}", time.perf_counter() - started)
+        return result
+
+    data = []
+
+    items = select('item_xpath', tree)
+
+    for item in items:
+        id = select('id_xpath', item)
+        model = select('model_xpath', item)
+        model = process_xpath_result(model)
+        if model.lower().startswith(brand_prefix.lower()):
+            model = model[len(brand_prefix):].strip()
+        price = select('price_xpath', item)
+        link = select('link_xpath', item)
+
+        if model:  # Добавляем только если есть модель
+            # Обрабатываем ссылку
+            link_value = process_xpath_result(link)
+            if link_value and not link_value.startswith('http'):
+                link_value = urljoin(url, link_value)
+
+            # replace "models.gac.alexsab.ru" to "gac.ru" in link_value only if link_value contains "models.gac.alexsab.ru"
+            if "models.gac.alexsab.ru" in link_value:
+                link_value = link_value.replace("models.gac.alexsab.ru", "gac.ru")
+
+            data.append({
+                'id': process_xpath_result(id),
+                'brand': brand_prefix,
+                'model': model,
+                'price': normalize_price(process_xpath_result(price)),
+                'benefit': 0,  # Поле benefit как в JS версии, выгоды на странице нет
+                'link': link_value
+            })
+
+    # Сортируем данные по ID
+    with metrics.stage('sort'):
+        data.sort(key=lambda x: x['id'])
+    print("Данные отсортированы по ID")
+
+    engines = {key: selector.engine for key, selector in selectors.items()}
+    metrics.set('engines', engines)
+    print(f"XPath движки для {brand_prefix}: {', '.join(f'{key}={engine}' for key, engine in engines.items())}")
+
+    return data
+
+_JSON_PATH_TOKEN_RE = re.compile(r'\.?([^.\[\]]+)|\[(\d+|\*)\]')
+_BENEFIT_RE = re.compile(r'выгода\s+до\s+([\d\s]+)\s*₽')
+_PRICE_RE = re.compile(r'(?:от|ОТ\s+)?([\d\s]+)\s*₽')
+
+def json_path(data, path):
+    """
+    Упрощённый JSONPath: `a.b[0].c`, `$.items[*].title`.
+    Возвращает список всех найденных значений ([*] разворачивает массив).
+    """
+    path = path.strip()
+    if path.startswith('$'):
+        path = path[1:]
+    nodes = [data]
+    for match in _JSON_PATH_TOKEN_RE.finditer(path):
+        key, index = match.groups()
+        found = []
+        for node in nodes:
+            if key is not None and isinstance(node, dict) and key in node:
+                found.append(node[key])
+            elif index == '*' and isinstance(node, list):
+                found.extend(node)
+            elif index is not None and index != '*' and isinstance(node, list) and int(index) < len(node):
+                found.append(node[int(index)])
+        nodes = found
+    return nodes
+
+def _split_benefit(value):
+    """Возвращает (выгода, строка без выгоды) для строки цены вида "от 2 319 000 ₽ выгода до 300 000 ₽"."""
+    value = str(value).lower()
+    match = _BENEFIT_RE.search(value)
+    if not match:
+        return 0, value
+    return int(re.sub(r'\s', '', match.group(1))), _BENEFIT_RE.sub('', value)
+
+def _min_price(value):
+    prices = [int(re.sub(r'\D', '', price)) for price in _PRICE_RE.findall(_split_benefit(value)[1]) if re.sub(r'\D', '', price)]
+    return min(prices) if prices else 0
+
+# Фильтры полей script_json: "link.url | last_segment | brand_prefix"
+SCRIPT_JSON_FILTERS = {
+    'last_segment': lambda value, ctx: [part for part in str(value).split('/') if part][-1],
+    'brand_prefix': lambda value, ctx: value if str(value).startswith(f"{ctx['brand']}-") else f"{ctx['brand']}-{value}",
+    'absolute': lambda value, ctx: value if str(value).startswith('http') else urljoin(ctx['url'], value),
+    'min_price': lambda value, ctx: _min_price(value),
+    'benefit': lambda value, ctx: _split_benefit(value)[0],
+    'strip': lambda value, ctx: str(value).strip(),
+}
+
+def find_script_json(page_content, regexp=None, selector=None):
+    """
+    Находит JSON, встроенный в страницу: по регулярному выражению (первая группа)
+    или по XPath элемента script (например, //script[@id='__NEXT_DATA__']).
+    """
+    if isinstance(page_content, bytes):
+        page_content = page_content.decode('utf-8', errors='replace')
+    if regexp:
+        match = re.search(regexp, page_content)
+        if not match:
+            raise ValueError("Не удалось найти соответствие регулярному выражению")
+        return json.loads(match.group(1))
+
+    nodes = compile_xpath(selector).select(html.fromstring(page_content))
+    if not nodes:
+        raise ValueError(f"Не найден элемент с JSON: {selector}")
+    node = nodes[0]
+    return json.loads(node if isinstance(node, str) else node.text_content())
+
+def extract_script_json(page_content, url, config, brand_prefix):
+    """
+    Извлекает модели из JSON, встроенного в страницу (источник script_json).
+
+    config: regexp или selector - где искать JSON, items - путь к списку моделей,
+    fields - пути к полям id, model, price, benefit, link относительно модели
+    с необязательными фильтрами через | (см. SCRIPT_JSON_FILTERS).
+    """
+    metrics = scrape_metrics.current()
+
+    with metrics.stage('parse'):
+        payload = find_script_json(page_content, config.get('regexp'), config.get('selector'))
+
+    items = json_path(payload, config['items'])
+    if len(items) == 1 and isinstance(items[0], list):
+        items = items[0]
+
+    context = {'brand': brand_prefix, 'url': url}
+
+    def field(item, name):
+        spec = config['fields'].get(name)
+        if not spec:
+            return None
+        path, *filters = [part.strip() for part in spec.split('|')]
+        values = json_path(item, path)
+        value = values[0] if values else None
+        for filter_name in filters:
+            if value is None:
+                break
+            value = SCRIPT_JSON_FILTERS[filter_name](value, context)
+        return value
+
+    data = []
+    with metrics.stage('extract'):
         for item in items:
-            # Извлекаем данные из результата elementpath
-            id = elementpath.select(item, xpaths['id_xpath'], parser=XPath3Parser)
-            model = elementpath.select(item, xpaths['model_xpath'], parser=XPath3Parser)
-            model = process_xpath_result(model)
+            model = field(item, 'model')
+            if not model:
+                continue
+            model = str(model).strip()
             if model.lower().startswith(brand_prefix.lower()):
                 model = model[len(brand_prefix):].strip()
-            price = elementpath.select(item, xpaths['price_xpath'], parser=XPath3Parser)
-            link = elementpath.select(item, xpaths['link_xpath'], parser=XPath3Parser)
-
-            if model:  # Добавляем только если есть модель
-                # Обрабатываем ссылку
-                link_value = process_xpath_result(link)
-                if link_value and not link_value.startswith('http'):
-                    link_value = urljoin(url, link_value)
-
-                # replace "models.gac.alexsab.ru" to "gac.ru" in link_value only if link_value contains "models.gac.alexsab.ru"
-                if "models.gac.alexsab.ru" in link_value:
-                    link_value = link_value.replace("models.gac.alexsab.ru", "gac.ru")
-
-                data.append({
-                    'id': process_xpath_result(id),
-                    'brand': brand_prefix,
-                    'model': model,
-                    'price': process_xpath_result(price),
-                    'benefit': "",  # Добавляем поле benefit как в JS версии
-                    'link': link_value
-                })
+            data.append({
+                'id': field(item, 'id'),
+                'brand': brand_prefix,
+                'model': model,
+                'price': normalize_price(field(item, 'price')),
+                'benefit': normalize_price(field(item, 'benefit'), empty=0),
+                'link': field(item, 'link'),
+            })
 
-        # Сортируем данные по ID
+    with metrics.stage('sort'):
         data.sort(key=lambda x: x['id'])
-        print("Данные отсортированы по ID")
+    print(f"Из встроенного JSON извлечено моделей: {len(data)}")
+    return data
+
+def find_embedded_models(page_content, models):
+    """
+    Ищет на странице скрипты, в которых встречаются названия моделей, уже
+    извлечённых через браузер. Если такие есть, данные бренда приходят в HTML
+    без клика и бренд можно перевести на источник script_json.
+    Возвращает список (описание скрипта, найдено моделей).
+    """
+    names = {str(item['model']).lower() for item in models if item.get('model')}
+    if not names or not page_content:
+        return []
+    tree = html.fromstring(page_content)
+    found = []
+    for script in tree.iter('script'):
+        text = (script.text or '').lower()
+        hits = sum(1 for name in names if name in text)
+        if hits * 2 >= len(names):
+            label = script.get('id') or script.get('type') or (script.text or '').strip()[:60]
+            found.append((label, hits))
+    return found
+
+def merge_records(data):
+    """Убирает повторы моделей по id (остаётся первая найденная) и сортирует по id."""
+    merged = {}
+    for item in data:
+        merged.setdefault(item['id'], item)
+    return sorted(merged.values(), key=lambda x: x['id'])
+
+_page_slots_lock = threading.Lock()
+_page_slots = {}
+
+def _page_slot(url):
+    host = urlparse(url).netloc
+    with _page_slots_lock:
+        if host not in _page_slots:
+            _page_slots[host] = threading.BoundedSemaphore(SCRAPE_PAGES_PER_HOST)
+        return _page_slots[host]
+
+def load_pages(urls, load):
+    """Загружает страницы параллельно, не больше SCRAPE_PAGES_PER_HOST одновременно с одного хоста."""
+    if len(urls) == 1:
+        return [(urls[0], load(urls[0]))]
+
+    metrics = scrape_metrics.current()
+
+    def load_one(page_url):
+        with scrape_metrics.use(metrics), _page_slot(page_url):
+            return page_url, load(page_url)
+
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        return list(executor.map(load_one, urls))
+
+def load_listing(url, pages, next_page_xpath, load, max_pages=SCRAPE_MAX_PAGES):
+    """
+    Загружает все страницы листинга бренда: url, затем адреса из pages
+    (параллельно), затем по ссылке next_page_xpath с последней страницы,
+    пока ссылка есть и не превышен max_pages. Возвращает [(url, содержимое)].
+    """
+    urls = list(dict.fromkeys([url] + [urljoin(url, page) for page in pages or []]))
+    loaded = load_pages(urls, load)
+    if not next_page_xpath:
+        return loaded
+
+    selector = compile_xpath(next_page_xpath)
+    seen = set(urls)
+    while len(loaded) < max_pages:
+        page_url, content = loaded[-1]
+        # По ответу 304 ссылку на следующую страницу не найти, поэтому такую страницу загружаем целиком
+        if content is NOT_MODIFIED:
+            content = http_fetcher.get_fresh(page_url)
+            loaded[-1] = (page_url, content)
+        if isinstance(content, StreamedPage):
+            content = content.content
+        if not content:
+            break
+        next_url = process_xpath_result(selector.select(html.fromstring(content)))
+        if not next_url:
+            break
+        next_url = urljoin(page_url, next_url)
+        if next_url in seen:
+            break
+        seen.add(next_url)
+        print(f"Следующая страница листинга: {next_url}")
+        loaded.append((next_url, load(next_url)))
+    return loaded
+
+def scrape_page(url, xpaths, brand_prefix, click_selector=None, wait_selector=None, wait_time=None, state_key=None,
+                after_click=None, after_click_selector=None, after_click_timeout=None, stream=None, stream_until=None,
+                script_json=None, browser_allow=None, pages=None, next_page_xpath=None, output_paths=None):
+    """
+    Загружает страницы бренда и извлекает модели. Возвращает список моделей,
+    UNCHANGED, если все output_paths уже содержат те же данные, или пустой список
+    при ошибке. Записывает файлы вызывающий (save_json), после чего вызывает commit_scrape.
+
+    Используются только аргументы: переменные окружения бренда (CLICK_SELECTOR,
+    PAGES и т.п.) читает запуск scrape.py из командной строки, иначе они
+    просочились бы во все бренды scrape_all.
+    """
+    try:
+        if wait_time is None:
+            wait_time = 1
+        after_click = after_click or AFTER_CLICK_DEFAULT
+        if after_click_timeout is None:
+            after_click_timeout = AFTER_CLICK_TIMEOUT
+        if after_click not in AFTER_CLICK_STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия ожидания после клика: {after_click}")
+        stream = bool(stream)
+        pages = pages or []
+
+        # Ключ состояния: имя бренда в манифесте или бренд + URL для одиночного запуска
+        state_key = state_key or default_state_key(brand_prefix, url)
+        previous = scrape_state.get(state_key)
+        config = {'xpaths': xpaths, 'script_json': script_json} if script_json else xpaths
+        config_hash = content_hash(json.dumps(config, sort_keys=True))
+        # Прошлые данные бренда записаны во все его файлы: новый путь в output_paths,
+        # удалённый или перезаписанный файл требуют записи, даже если страница прежняя
+        written = outputs_match(output_paths, previous.get('records'))
+        # Ответу 304 можно верить, только если прошлый запуск с этой же конфигурацией
+        # извлёк и записал данные бренда; иначе (новый бренд на общем URL, правка
+        # XPath, пустой или незаписанный результат) страница загружается целиком
+        conditional = written and previous.get('config') == config_hash
+
+        def load(page_url):
+            return load_page(
+                page_url, click_selector, wait_selector, wait_time,
+                after_click=after_click,
+                after_click_selector=after_click_selector,
+                after_click_timeout=after_click_timeout,
+                stream=stream,
+                stream_until=stream_until,
+                browser_allow=browser_allow,
+                conditional=conditional,
+            )
+
+        # Загружаем страницу или все страницы листинга
+        if pages or next_page_xpath:
+            loaded = load_listing(url, pages, next_page_xpath, load)
+        else:
+            loaded = [(url, load(url))]
+
+        # Страницы не изменились с прошлого запуска - разбирать нечего
+        if all(content is NOT_MODIFIED for _, content in loaded):
+            return UNCHANGED
+        # Если изменилась только часть листинга, тело страниц с ответом 304 нужно для разбора
+        loaded = [(page_url, http_fetcher.get_fresh(page_url) if content is NOT_MODIFIED else content)
+                  for page_url, content in loaded]
+
+        page_contents = []
+        for page_url, page_content in loaded:
+            tree = None
+            if isinstance(page_content, StreamedPage):
+                tree = page_content.tree
+                page_content = page_content.content
+
+            # Если страница не загрузилась, возвращаем пустой список: неполный листинг потерял бы модели
+            if not page_content:
+                print(f"Страница {page_url} не загрузилась, возвращаем пустой список")
+                return []
+            page_contents.append((page_url, page_content, tree))
+        page_urls = [page_url for page_url, _, _ in page_contents]
+
+        # У script_json данные лежат в <script>, который normalize_html вырезает,
+        # поэтому для них хэш HTML не показателен - проверяется только хэш данных
+        html_hash = None
+        if not script_json:
+            page_hashes = [content_hash(normalize_html(page_content)) for _, page_content, _ in page_contents]
+            html_hash = page_hashes[0] if len(page_hashes) == 1 else content_hash(' '.join(page_hashes))
+
+        if written and html_hash and previous.get('html') == html_hash and previous.get('config') == config_hash:
+            print("HTML не изменился с прошлого запуска, разбор пропущен")
+            scrape_state.stage(state_key, page_urls, html=html_hash, config=config_hash, records=previous.get('records'))
+            commit_scrape(state_key)
+            return UNCHANGED
+
+        data = []
+        for page_url, page_content, tree in page_contents:
+            if script_json:
+                data.extend(extract_script_json(page_content, page_url, script_json, brand_prefix))
+            else:
+                data.extend(extract_data(page_content, page_url, xpaths, brand_prefix, tree))
+        if len(page_contents) > 1:
+            data = merge_records(data)
+            print(f"Страниц листинга: {len(page_contents)}, моделей после удаления повторов: {len(data)}")
+        if not data:
+            return data
+
+        records_hash = content_hash(serialize_records(data))
+        # Состояние сохранит commit_scrape после записи файлов, иначе неудачная
+        # запись выглядела бы на следующем запуске как неизменившиеся данные
+        scrape_state.stage(state_key, page_urls, html=html_hash, config=config_hash, records=records_hash)
+
+        if written and previous.get('records') == records_hash:
+            print("Извлечённые данные не изменились с прошлого запуска")
+            commit_scrape(state_key)
+            return UNCHANGED
 
         return data
     except Exception as e:
@@ -230,20 +1461,50 @@ if __name__ == "__main__":
 
         brand_prefix = os.getenv('BRAND')
 
-        data = scrape_page(url, xpaths, brand_prefix)
-        print(json.dumps(data, indent=2))
-        
-        if data:
-            # Разделяем пути по запятой
-            output_file_paths = os.getenv('OUTPUT_PATHS', './output/data.json').split(',')
-                        
-            save_json(
+        # Источник script_json: конфигурация в виде JSON, как в scrape-brands.json
+        script_json = json.loads(os.getenv('SCRIPT_JSON')) if os.getenv('SCRIPT_JSON') else None
+
+        # Разделяем пути по запятой
+        output_file_paths = os.getenv('OUTPUT_PATHS', './output/data.json').split(',')
+
+        state_key = default_state_key(brand_prefix, url)
+        data = scrape_page(
+            url,
+            xpaths,
+            brand_prefix,
+            # Параметры кликов, потоковой загрузки и листинга для одиночного запуска
+            click_selector=os.getenv('CLICK_SELECTOR'),
+            wait_selector=os.getenv('WAIT_SELECTOR'),
+            wait_time=int(os.getenv('WAIT_TIME', '1')),
+            state_key=state_key,
+            after_click=os.getenv('AFTER_CLICK'),
+            after_click_selector=os.getenv('AFTER_CLICK_SELECTOR'),
+            after_click_timeout=float(os.getenv('AFTER_CLICK_TIMEOUT', AFTER_CLICK_TIMEOUT)),
+            stream=SCRAPE_STREAM,
+            stream_until=os.getenv('STREAM_UNTIL'),
+            script_json=script_json,
+            pages=[page.strip() for page in os.getenv('PAGES', '').split(',') if page.strip()],
+            next_page_xpath=os.getenv('NEXT_PAGE_XPATH'),
+            output_paths=output_file_paths,
+        )
+
+        if data is UNCHANGED:
+            print("Данные не изменились с прошлого запуска, файлы не перезаписываются.")
+        elif data:
+            print(json.dumps(data, indent=2))
+
+            report = save_json(
                 data, 
                 output_file_paths,
                 brand_prefix
             )
+            changed = sum(1 for status in report.values() if status == 'changed')
+            print(f"Изменено файлов: {changed} из {len(report)}")
+            if 'error' not in report.values():
+                commit_scrape(state_key)
         else:
             print("Данные не были получены, файл не записывается.")
+        changeset.save()
     except Exception as e:
         logError("Критическая ошибка в main", str(e))
         print("Скрипт завершен с ошибкой, но не прерывает workflow")
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Запуск всех скраперов брендов в одном процессе.
+
+Описания брендов берутся из манифеста scrape-brands.json (те же параметры,
+что раньше экспортировались в .github/scripts/sh/scrape-*.sh). Бренды
+обрабатываются пулом потоков с ограничением числа одновременных запросов
+к одному хосту.
+
+Ход запуска сохраняется в SCRAPE_RUN_STATE: статус, время, хэши выходных
+файлов и ошибка по каждому бренду. --resume продолжает прерванный или
+неудачный запуск только для незавершённых брендов, --retry-failed N
+повторяет упавшие бренды в том же процессе. В конце файлы многобрендовых
+дилеров собираются из полученных данных (merge_json.py, отключается
+--no-merge).
+
+Пример:
+    python3 .github/scripts/scrape_all.py              # все включённые бренды
+    python3 .github/scripts/scrape_all.py geely haval  # только указанные
+    python3 .github/scripts/scrape_all.py --retry-failed 2
+    python3 .github/scripts/scrape_all.py --resume
+    python3 .github/scripts/scrape_all.py --schedule   # только бренды, которым пора обновиться
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import merge_json
+import scrape
+import scrape_metrics
+import scrape_schedule
+from scrape import SCRAPE_STREAM, UNCHANGED, atomic_write, changeset, commit_scrape, content_hash, logError, save_json, scrape_page
+
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scrape-brands.json')
+
+# Общее число потоков и лимит одновременных запросов к одному хосту
+MAX_WORKERS = int(os.getenv('SCRAPE_WORKERS', '8'))
+PER_HOST_LIMIT = int(os.getenv('SCRAPE_PER_HOST', '2'))
+
+XPATH_KEYS = ('item_xpath', 'id_xpath', 'model_xpath', 'price_xpath', 'link_xpath')
+
+# Файл хода последнего запуска; пустое значение отключает сохранение
+RUN_STATE_PATH = os.getenv('SCRAPE_RUN_STATE', '.cache/scrape-run.json')
+# Бренды с этими статусами считаются обработанными; empty и error - неудачными
+DONE_STATUSES = ('ok', 'unchanged')
+FAILED_STATUSES = ('empty', 'error')
+
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def select_brands(manifest, names=None):
+    """
+    Возвращает список (имя, конфиг) для запуска.
+    Без имён берутся все бренды, у которых не указано "enabled": false.
+    Явно указанные имена запускаются даже если бренд выключен.
+    """
+    if not names:
+        return [(name, cfg) for name, cfg in manifest.items() if cfg.get('enabled', True)]
+
+    unknown = [name for name in names if name not in manifest]
+    if unknown:
+        raise KeyError(f"Неизвестные бренды в манифесте: {', '.join(unknown)}")
+    return [(name, manifest[name]) for name in names]
+
+
+class HostLimiter:
+    """Семафоры по хосту: не больше `limit` одновременных загрузок с одного домена."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def for_url(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+            return self._semaphores[host]
+
+
+def output_hashes(paths):
+    """sha256 выходных файлов бренда (None, если файла нет)."""
+    hashes = {}
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                hashes[path] = content_hash(f.read())
+        except OSError:
+            hashes[path] = None
+    return hashes
+
+
+class RunState:
+    """
+    Ход запуска по брендам: pending -> running -> ok/unchanged/empty/error.
+    Файл перезаписывается атомарно после каждого изменения, поэтому после
+    падения процесса в нём остаётся, какие бренды не были завершены.
+    """
+
+    def __init__(self, path=RUN_STATE_PATH, data=None):
+        self.path = path
+        self.data = data
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=RUN_STATE_PATH):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(path, json.load(f))
+        except (OSError, ValueError) as e:
+            logError("Ошибка при чтении состояния запуска", f"{path}: {e}")
+            return None
+
+    def start(self, run_id, names):
+        self.data = {
+            'run': run_id,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'finished': None,
+            'brands': {name: {'status': 'pending', 'attempts': 0} for name in names},
+        }
+        self._save()
+
+    def unfinished(self):
+        return [name for name, brand in self.data['brands'].items() if brand['status'] not in DONE_STATUSES]
+
+    def failed(self):
+        return [name for name, brand in self.data['brands'].items() if brand['status'] in FAILED_STATUSES]
+
+    def mark_running(self, name):
+        with self._lock:
+            brand = self.data['brands'].setdefault(name, {'attempts': 0})
+            brand['status'] = 'running'
+            brand['attempts'] = brand.get('attempts', 0) + 1
+            self._save()
+
+    def record(self, name, result, outputs):
+        with self._lock:
+            brand = self.data['brands'].setdefault(name, {'attempts': 1})
+            brand.update({
+                'status': result['status'],
+                'items': result['items'],
+                'seconds': result['seconds'],
+                'outputs': outputs,
+                'error': result.get('error'),
+                'run': result['run'],
+            })
+            self._save()
+
+    def finish(self):
+        with self._lock:
+            self.data['finished'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            payload = json.dumps(self.data, ensure_ascii=False, indent=2).encode('utf-8')
+            atomic_write(self.path, payload)
+        except OSError as e:
+            logError("Ошибка при сохранении состояния запуска", f"{self.path}: {e}")
+
+
+def run_brand(name, cfg, limiter, metrics_log, collected=None):
+    # У брендов со встроенным JSON (script_json) XPath выражений нет
+    xpaths = {key: cfg[key] for key in XPATH_KEYS if key in cfg}
+
+    started = time.monotonic()
+    with scrape_metrics.track(name) as metrics:
+        with limiter.for_url(cfg['url']):
+            data = scrape_page(
+                cfg['url'],
+                xpaths,
+                cfg['brand'],
+                click_selector=cfg.get('click_selector'),
+                wait_selector=cfg.get('wait_selector'),
+                wait_time=cfg.get('wait_time', 1),
+                state_key=name,
+                after_click=cfg.get('after_click'),
+                after_click_selector=cfg.get('after_click_selector'),
+                after_click_timeout=cfg.get('after_click_timeout'),
+                # SCRAPE_STREAM=1 - общий переключатель запуска, "stream" бренда важнее
+                stream=cfg.get('stream', SCRAPE_STREAM),
+                stream_until=cfg.get('stream_until'),
+                script_json=cfg.get('script_json'),
+                browser_allow=cfg.get('browser_allow'),
+                pages=cfg.get('pages'),
+                next_page_xpath=cfg.get('next_page_xpath'),
+                output_paths=cfg['output_paths'],
+            )
+
+        files = {}
+        if data is UNCHANGED:
+            status, items = 'unchanged', 0
+            print(f"[{name}] Данные не изменились, файлы не перезаписываются.")
+        elif data:
+            status, items = 'ok', len(data)
+            files = save_json(data, cfg['output_paths'], cfg['brand'])
+            if 'error' not in files.values():
+                commit_scrape(name)
+            if collected is not None:
+                for path in cfg['output_paths']:
+                    collected[path] = data
+        else:
+            status, items = 'empty', 0
+            print(f"[{name}] Данные не были получены, файл не записывается.")
+
+    record = metrics.to_record(
+        metrics_log.run_id,
+        status=status,
+        items=items,
+        files=files,
+        seconds=round(time.monotonic() - started, 3),
+    )
+    metrics_log.write(record)
+    return record
+
+
+def run_all(brands, workers=MAX_WORKERS, per_host=PER_HOST_LIMIT, metrics_log=None, state=None, collected=None):
+    limiter = HostLimiter(per_host)
+    metrics_log = metrics_log or scrape_metrics.MetricsLog()
+    outputs = {name: cfg['output_paths'] for name, cfg in brands}
+    results = []
+
+    def run_one(name, cfg):
+        if state:
+            state.mark_running(name)
+        return run_brand(name, cfg, limiter, metrics_log, collected)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_one, name, cfg): name for name, cfg in brands}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logError(f"Ошибка при обработке бренда {name}", str(e))
+                result = {'run': metrics_log.run_id, 'brand': name, 'status': 'error', 'items': 0,
+                          'files': {}, 'seconds': None, 'error': str(e)}
+                metrics_log.write(result)
+            if state:
+                state.record(name, result, output_hashes(outputs[name]))
+            print(f"[{name}] Готово: {result['status']}, {result['items']} моделей")
+            results.append(result)
+
+    return results
+
+
+def print_summary(results, elapsed, metrics_log):
+    print("\n--- Итог ---")
+    scrape_metrics.print_summary(results)
+    print(f"Всего: {len(results)} брендов за {elapsed:.2f}s")
+    if metrics_log.path:
+        print(f"Метрики: {metrics_log.path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Скрапинг брендов из манифеста в одном процессе')
+    parser.add_argument('brands', nargs='*', help='Имена брендов из манифеста (по умолчанию все включённые)')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='Путь к манифесту брендов')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help='Размер пула потоков')
+    parser.add_argument('--per-host', type=int, default=PER_HOST_LIMIT, help='Лимит одновременных загрузок с одного хоста')
+    parser.add_argument('--metrics-dir', default=scrape_metrics.SCRAPE_METRICS_DIR, help='Каталог для JSON Lines метрик запуска')
+    parser.add_argument('--state', default=RUN_STATE_PATH, help='Файл состояния запуска')
+    parser.add_argument('--resume', action='store_true', help='Запустить только бренды, не завершённые в прошлом запуске')
+    parser.add_argument('--retry-failed', type=int, default=0, metavar='N', help='Сколько раз повторить упавшие бренды')
+    parser.add_argument('--schedule', action='store_true',
+                        help='Запустить только бренды с истёкшим TTL; указанные бренды запускаются всегда')
+    parser.add_argument('--full', action='store_true', help='С --schedule: обновить все бренды (полный обход)')
+    parser.add_argument('--no-merge', action='store_true', help='Не собирать файлы многобрендовых дилеров')
+    args = parser.parse_args(argv)
+
+    schedule = None
+    full_sweep = False
+    try:
+        manifest = load_manifest(args.manifest)
+        if args.schedule:
+            forced = select_brands(manifest, args.brands) if args.brands else []
+            candidates = select_brands(manifest) + [item for item in forced if not item[1].get('enabled', True)]
+            schedule = scrape_schedule.Schedule()
+            brands, reasons, full_sweep = schedule.select(candidates, forced=set(args.brands), full=args.full)
+            print(f"По расписанию: {len(brands)} из {len(candidates)} брендов" + (" (полный обход)" if full_sweep else ""))
+            for name, _ in brands:
+                print(f"  {name}: {reasons[name]}")
+        else:
+            brands = select_brands(manifest, args.brands)
+    except Exception as e:
+        logError("Ошибка чтения манифеста брендов", str(e))
+        return 0
+
+    metrics_log = scrape_metrics.MetricsLog(args.metrics_dir)
+    changeset.run_id = os.getenv('SCRAPE_RUN_ID') or metrics_log.run_id
+    state = RunState.load(args.state) if args.resume else None
+    if state:
+        unfinished = state.unfinished()
+        brands = [(name, cfg) for name, cfg in brands if name in unfinished]
+        print(f"Продолжение запуска {state.data['run']}: {len(brands)} незавершённых брендов")
+    else:
+        if args.resume:
+            print("Нет сохранённого запуска, выполняется полный запуск")
+        state = RunState(args.state)
+        state.start(metrics_log.run_id, [name for name, _ in brands])
+
+    started = time.monotonic()
+    results = {}
+    # Данные обработанных брендов по выходным путям, чтобы не перечитывать их при объединении
+    collected = {}
+    for result in run_all(brands, workers=args.workers, per_host=args.per_host, metrics_log=metrics_log,
+                          state=state, collected=collected):
+        results[result['brand']] = result
+
+    for attempt in range(1, args.retry_failed + 1):
+        failed = state.failed()
+        retry = [(name, cfg) for name, cfg in brands if name in failed]
+        if not retry:
+            break
+        print(f"\nПовтор {attempt}/{args.retry_failed}: {', '.join(name for name, _ in retry)}")
+        # Страницы неудачных брендов (ответ со сменившейся вёрсткой и т.п.) загружаются заново
+        scrape.http_fetcher.forget()
+        for result in run_all(retry, workers=args.workers, per_host=args.per_host, metrics_log=metrics_log,
+                              state=state, collected=collected):
+            results[result['brand']] = result
+
+    if not args.no_merge:
+        try:
+            merged = merge_json.merge_all(records=collected)
+            changed = sum(1 for status in merged.values() if status == 'changed')
+            print(f"Файлы дилеров: изменено {changed} из {len(merged)}")
+        except Exception as e:
+            logError("Ошибка слияния файлов", str(e))
+
+    changeset.save()
+    state.finish()
+    if schedule:
+        schedule.record(results.values(), full=full_sweep)
+    print_summary(list(results.values()), time.monotonic() - started, metrics_log)
+    # Как и scrape.py, не прерываем workflow из-за ошибок отдельных брендов
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
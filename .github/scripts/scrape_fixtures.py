@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Офлайн-фикстуры страниц брендов: запись, воспроизведение и бенчмарк извлечения.
+
+  record - загружает страницы брендов из манифеста (для брендов с кликом -
+           и исходный HTML, и HTML после клика) в каталог фикстур и сохраняет
+           извлечённые данные как эталон <бренд>.golden.json;
+  replay - прогоняет scrape_page по фикстурам без сети и браузера и сравнивает
+           результат с эталоном: так изменения XPath или кода извлечения
+           проверяются на любой машине без Chrome;
+  bench  - измеряет extract_data на фикстурах: мс на страницу и моделей в секунду;
+  probe  - для брендов с кликом проверяет, нет ли моделей во встроенном JSON
+           исходной страницы (тогда Selenium не нужен, см. script_json).
+
+Пример:
+    python3 .github/scripts/scrape_fixtures.py record geely haval
+    python3 .github/scripts/scrape_fixtures.py replay
+    python3 .github/scripts/scrape_fixtures.py bench --repeat 20
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+import scrape
+from scrape import (atomic_write, extract_data, extract_script_json, find_embedded_models, fixture_path,
+                    read_fixture, scrape_page, write_fixture, HttpFetcher, ScrapeState, UNCHANGED)
+from scrape_all import MANIFEST_PATH, XPATH_KEYS, load_manifest, select_brands
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def golden_path(directory, name):
+    return os.path.join(directory, f"{name}.golden.json")
+
+
+def brand_xpaths(cfg):
+    return {key: cfg[key] for key in XPATH_KEYS if key in cfg}
+
+
+def extract(page_content, cfg):
+    if cfg.get('script_json'):
+        return extract_script_json(page_content, cfg['url'], cfg['script_json'], cfg['brand'])
+    return extract_data(page_content, cfg['url'], brand_xpaths(cfg), cfg['brand'])
+
+
+def offline_mode():
+    """Отключает условные запросы и хэши прошлых запусков: фикстуре нужен полный ответ и полный разбор."""
+    scrape.http_fetcher = HttpFetcher(cache_dir='')
+    scrape.scrape_state = ScrapeState('')
+
+
+def run_scrape(name, cfg):
+    data = scrape_page(
+        cfg['url'],
+        brand_xpaths(cfg),
+        cfg['brand'],
+        click_selector=cfg.get('click_selector'),
+        wait_selector=cfg.get('wait_selector'),
+        wait_time=cfg.get('wait_time', 1),
+        state_key=name,
+        after_click=cfg.get('after_click'),
+        after_click_selector=cfg.get('after_click_selector'),
+        after_click_timeout=cfg.get('after_click_timeout'),
+        script_json=cfg.get('script_json'),
+        browser_allow=cfg.get('browser_allow'),
+        pages=cfg.get('pages'),
+        next_page_xpath=cfg.get('next_page_xpath'),
+    )
+    return [] if data is UNCHANGED else data
+
+
+def diff_records(expected, actual):
+    """Список расхождений с эталоном по id моделей; пустой список - результат совпал."""
+    if expected == actual:
+        return []
+
+    expected_by_id = {item['id']: item for item in expected}
+    actual_by_id = {item['id']: item for item in actual}
+    problems = []
+    for item_id in sorted(set(expected_by_id) - set(actual_by_id)):
+        problems.append(f"пропала модель {item_id}")
+    for item_id in sorted(set(actual_by_id) - set(expected_by_id)):
+        problems.append(f"новая модель {item_id}")
+    for item_id in sorted(set(expected_by_id) & set(actual_by_id)):
+        old, new = expected_by_id[item_id], actual_by_id[item_id]
+        for key in sorted(set(old) | set(new)):
+            if old.get(key) != new.get(key):
+                problems.append(f"{item_id}.{key}: {old.get(key)!r} -> {new.get(key)!r}")
+    if not problems:
+        problems.append("изменился порядок моделей")
+    return problems
+
+
+def read_golden(directory, name):
+    path = golden_path(directory, name)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def record(brands, directory):
+    offline_mode()
+    scrape.SCRAPE_RECORD_DIR = directory
+    failed = 0
+    for name, cfg in brands:
+        print(f"[{name}] Запись фикстуры {cfg['url']}")
+        data = run_scrape(name, cfg)
+        if cfg.get('click_selector'):
+            # Исходная страница до клика нужна для сравнения с requests-загрузкой
+            raw = scrape.http_fetcher.get_fresh(cfg['url'])
+            if raw:
+                write_fixture(cfg['url'], raw, directory=directory)
+                report_embedded(name, raw, data)
+        if not data:
+            print(f"[{name}] Данные не получены, эталон не записан")
+            failed += 1
+            continue
+        payload = (json.dumps(data, ensure_ascii=False, indent=2) + '\n').encode('utf-8')
+        atomic_write(golden_path(directory, name), payload)
+        print(f"[{name}] Эталон: {len(data)} моделей")
+    return 1 if failed else 0
+
+
+def report_embedded(name, page_content, data):
+    for label, hits in find_embedded_models(page_content, data):
+        print(f"[{name}] Модели есть в HTML без клика: скрипт {label!r} ({hits} из {len(data)}), "
+              f"бренд можно перевести на script_json")
+
+
+def probe(brands, directory):
+    """Для брендов с кликом ищет модели из эталона во встроенных скриптах исходной страницы."""
+    for name, cfg in brands:
+        if not cfg.get('click_selector'):
+            continue
+        expected = read_golden(directory, name)
+        if not expected:
+            print(f"[{name}] Нет эталона, сначала выполните record")
+            continue
+        path = fixture_path(directory, cfg['url'])
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                raw = f.read()
+        else:
+            raw = scrape.http_fetcher.get_fresh(cfg['url'])
+        found = find_embedded_models(raw, expected)
+        if not found:
+            print(f"[{name}] Встроенного JSON с моделями не найдено, нужен браузер")
+        report_embedded(name, raw, expected)
+    return 0
+
+
+def replay(brands, directory):
+    offline_mode()
+    scrape.SCRAPE_REPLAY_DIR = directory
+    failed = 0
+    results = []
+    for name, cfg in brands:
+        expected = read_golden(directory, name)
+        if expected is None:
+            results.append((name, 'no golden', []))
+            continue
+        with redirect_stdout(io.StringIO()):
+            data = run_scrape(name, cfg)
+        problems = diff_records(expected, data)
+        results.append((name, 'diff' if problems else 'ok', problems))
+        failed += bool(problems)
+
+    for name, status, problems in results:
+        print(f"{name:<16} {status}")
+        for problem in problems[:20]:
+            print(f"    {problem}")
+        if len(problems) > 20:
+            print(f"    ... и ещё {len(problems) - 20}")
+    return 1 if failed else 0
+
+
+def bench(brands, directory, repeat):
+    print(f"{'brand':<16} {'items':>6} {'ms/page':>10} {'items/s':>10} {'golden':>8}")
+    for name, cfg in brands:
+        path = fixture_path(directory, cfg['url'], cfg.get('click_selector'))
+        if not os.path.exists(path):
+            print(f"{name:<16} нет фикстуры {path}")
+            continue
+        with redirect_stdout(io.StringIO()):
+            page_content = read_fixture(cfg['url'], cfg.get('click_selector'), directory)
+
+        # Первый прогон компилирует XPath и не входит в замер
+        with redirect_stdout(io.StringIO()):
+            data = extract(page_content, cfg)
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                data = extract(page_content, cfg)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        expected = read_golden(directory, name)
+        golden = '-' if expected is None else ('diff' if diff_records(expected, data) else 'ok')
+        per_second = len(data) / best if best else 0
+        print(f"{name:<16} {len(data):>6} {best * 1000:>10.2f} {per_second:>10.0f} {golden:>8}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Запись и офлайн-прогон фикстур страниц брендов')
+    parser.add_argument('command', choices=('record', 'replay', 'bench', 'probe'))
+    parser.add_argument('brands', nargs='*', help='Имена брендов из манифеста (по умолчанию все включённые)')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='Путь к манифесту брендов')
+    parser.add_argument('--dir', default=FIXTURES_DIR, help='Каталог фикстур')
+    parser.add_argument('--repeat', type=int, default=10, help='Число прогонов в bench, берётся лучший')
+    args = parser.parse_args(argv)
+
+    brands = select_brands(load_manifest(args.manifest), args.brands)
+    if args.command == 'record':
+        return record(brands, args.dir)
+    if args.command == 'replay':
+        return replay(brands, args.dir)
+    if args.command == 'probe':
+        return probe(brands, args.dir)
+    return bench(brands, args.dir, args.repeat)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
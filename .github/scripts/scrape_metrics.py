@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Метрики запусков скрапинга по брендам и этапам.
+
+Во время запуска scrape_all.py каждый бренд получает свой BrandMetrics
+(хранится в threading.local), куда scrape.py пишет время этапов: dns,
+connect_ttfb, download, driver_startup, browser_load, after_click, parse,
+xpath.<поле> (extract для script_json), sort, write. По завершении бренда
+запись добавляется строкой в JSON Lines файл запуска.
+
+Просмотр и сравнение запусков:
+    python3 .github/scripts/scrape_metrics.py summary [FILE]
+    python3 .github/scripts/scrape_metrics.py compare [OLD NEW]
+Без аргументов берутся последние файлы из SCRAPE_METRICS_DIR.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Каталог, куда каждый запуск пишет свой <run_id>.jsonl
+SCRAPE_METRICS_DIR = os.getenv('SCRAPE_METRICS_DIR', '.cache/metrics')
+
+# Столбцы сводной таблицы: этап -> какие метрики в него входят
+SUMMARY_COLUMNS = (
+    ('fetch', ('dns', 'connect_ttfb', 'download')),
+    ('browser', ('driver_startup', 'browser_load', 'after_click')),
+    ('parse', ('parse',)),
+    ('extract', ('xpath.', 'extract')),
+    ('sort', ('sort',)),
+    ('write', ('write',)),
+)
+
+_local = threading.local()
+
+
+class BrandMetrics:
+    def __init__(self, name=None):
+        self.name = name
+        self.stages = {}
+        self.values = {}
+        # Страницы одного бренда могут загружаться в нескольких потоках
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def set(self, key, value):
+        with self._lock:
+            self.values[key] = value
+
+    def to_record(self, run_id, **extra):
+        record = {'run': run_id, 'brand': self.name}
+        record.update(extra)
+        record['stages'] = {name: round(seconds, 4) for name, seconds in self.stages.items()}
+        record.update(self.values)
+        return record
+
+
+def current():
+    """Метрики бренда, который обрабатывается в текущем потоке (или пустые, если их никто не собирает)."""
+    return getattr(_local, 'metrics', None) or BrandMetrics()
+
+
+@contextmanager
+def track(name):
+    with use(BrandMetrics(name)) as metrics:
+        yield metrics
+
+
+@contextmanager
+def use(metrics):
+    """Пишет метрики текущего потока в уже созданный BrandMetrics (например, из рабочих потоков бренда)."""
+    previous = getattr(_local, 'metrics', None)
+    _local.metrics = metrics
+    try:
+        yield metrics
+    finally:
+        _local.metrics = previous
+
+
+class MetricsLog:
+    """JSON Lines файл одного запуска; запись потокобезопасна."""
+
+    def __init__(self, directory=SCRAPE_METRICS_DIR, run_id=None):
+        self.run_id = run_id or time.strftime('%Y%m%d-%H%M%S')
+        self.path = os.path.join(directory, f"{self.run_id}.jsonl") if directory else None
+        self.records = []
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self.records.append(record)
+            if not self.path:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def read_records(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def latest_files(directory=SCRAPE_METRICS_DIR, count=1):
+    return sorted(glob.glob(os.path.join(directory, '*.jsonl')))[-count:]
+
+
+def column_value(stages, prefixes):
+    return sum(seconds for name, seconds in stages.items() if name.startswith(prefixes))
+
+
+def print_summary(records):
+    header = f"{'brand':<16} {'status':<11} {'items':>5} {'files':>6} {'total':>7}"
+    header += ''.join(f" {name:>8}" for name, _ in SUMMARY_COLUMNS)
+    print(header)
+    for record in sorted(records, key=lambda r: r['brand']):
+        total = record.get('seconds')
+        files = record.get('files', {})
+        changed = sum(1 for status in files.values() if status == 'changed')
+        line = f"{record['brand']:<16} {record.get('status', ''):<11} {record.get('items', 0):>5} "
+        line += f"{f'{changed}/{len(files)}':>6} "
+        line += f"{'-' if total is None else f'{total:.2f}':>7}"
+        for _, prefixes in SUMMARY_COLUMNS:
+            line += f" {column_value(record.get('stages', {}), prefixes):>8.3f}"
+        print(line)
+
+
+def print_compare(old_records, new_records):
+    old_by_brand = {r['brand']: r for r in old_records}
+    new_by_brand = {r['brand']: r for r in new_records}
+
+    print(f"{'brand':<16} {'old':>7} {'new':>7} {'delta':>8}  этапы с изменением больше 50 мс")
+    for brand in sorted(set(old_by_brand) | set(new_by_brand)):
+        old = old_by_brand.get(brand)
+        new = new_by_brand.get(brand)
+        if not old or not new:
+            print(f"{brand:<16} {'только в ' + ('новом' if new else 'старом') + ' запуске'}")
+            continue
+
+        old_total = old.get('seconds') or 0
+        new_total = new.get('seconds') or 0
+        stages = set(old.get('stages', {})) | set(new.get('stages', {}))
+        changes = []
+        for stage in sorted(stages):
+            delta = new.get('stages', {}).get(stage, 0) - old.get('stages', {}).get(stage, 0)
+            if abs(delta) >= 0.05:
+                changes.append(f"{stage} {delta:+.2f}")
+        print(f"{brand:<16} {old_total:>7.2f} {new_total:>7.2f} {new_total - old_total:>+8.2f}  {', '.join(changes)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Сводка и сравнение метрик запусков скрапинга')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    summary = subparsers.add_parser('summary', help='Сводная таблица одного запуска')
+    summary.add_argument('file', nargs='?', help='JSON Lines файл запуска (по умолчанию последний)')
+    compare = subparsers.add_parser('compare', help='Сравнение двух запусков')
+    compare.add_argument('files', nargs='*', help='OLD NEW (по умолчанию два последних запуска)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'summary':
+        files = [args.file] if args.file else latest_files()
+        if not files:
+            print(f"Нет файлов метрик в {SCRAPE_METRICS_DIR}")
+            return 1
+        print(f"Запуск: {files[0]}")
+        print_summary(read_records(files[0]))
+        return 0
+
+    files = args.files or latest_files(count=2)
+    if len(files) != 2:
+        print("Для сравнения нужны два файла метрик")
+        return 1
+    print(f"Сравнение: {files[0]} -> {files[1]}")
+    print_compare(read_records(files[0]), read_records(files[1]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Расписание обновления брендов по частоте изменений.
+
+После каждого запуска scrape_all.py --schedule для бренда запоминается
+проверка: когда была и изменились ли данные. По истории последних проверок
+для бренда рассчитывается TTL - примерно половина среднего интервала между
+изменениями, в пределах SCRAPE_MIN_TTL_HOURS..SCRAPE_MAX_TTL_HOURS. Очередной
+запуск по cron берёт только бренды, у которых TTL истёк, бренды с неудачной
+прошлой проверкой и явно указанные; раз в SCRAPE_FULL_SWEEP_HOURS
+обновляются все бренды. "ttl_hours" в манифесте задаёт TTL бренда вручную.
+
+История хранится в .cache, который не попадает в git, поэтому расписание
+работает там, где .cache переживает запуски (локально, на сервере). Workflow
+scrape.yml его не использует: по cron там запускаются скрипты брендов из sh.
+
+Просмотр расписания:
+    python3 .github/scripts/scrape_schedule.py
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from scrape import atomic_write, logError
+
+SCHEDULE_PATH = os.getenv('SCRAPE_SCHEDULE', '.cache/scrape-schedule.json')
+MIN_TTL_HOURS = float(os.getenv('SCRAPE_MIN_TTL_HOURS', '4'))
+MAX_TTL_HOURS = float(os.getenv('SCRAPE_MAX_TTL_HOURS', '48'))
+FULL_SWEEP_HOURS = float(os.getenv('SCRAPE_FULL_SWEEP_HOURS', '24'))
+
+# Сколько последних проверок бренда учитывается при расчёте TTL
+HISTORY_SIZE = 30
+# Запас на неровный запуск cron: бренд считается просроченным чуть раньше TTL
+DUE_SLACK_HOURS = 0.25
+
+
+def learned_ttl(history, now):
+    """
+    TTL в часах по истории [(время проверки, изменились ли данные), ...].
+    Пока проверок мало, TTL минимальный и растёт, только если изменений нет.
+    """
+    if len(history) < 2:
+        return MIN_TTL_HOURS
+    span_hours = (now - history[0][0]) / 3600
+    changes = sum(1 for _, changed in history if changed)
+    ttl = span_hours / (changes + 1) / 2
+    return min(MAX_TTL_HOURS, max(MIN_TTL_HOURS, ttl))
+
+
+def is_changed(result):
+    """Бренд изменился, если хотя бы один его выходной файл был перезаписан."""
+    return result['status'] == 'ok' and any(status == 'changed' for status in result.get('files', {}).values())
+
+
+class Schedule:
+    def __init__(self, path=SCHEDULE_PATH):
+        self.path = path
+        self.data = {'last_full_sweep': None, 'brands': {}}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError) as e:
+                logError("Ошибка при чтении расписания", f"{path}: {e}")
+
+    def ttl_hours(self, name, cfg, now):
+        if cfg.get('ttl_hours') is not None:
+            return float(cfg['ttl_hours'])
+        brand = self.data['brands'].get(name, {})
+        return learned_ttl(brand.get('history', []), now)
+
+    def reason(self, name, cfg, now):
+        """Почему бренд надо обновить сейчас, или None, если его TTL ещё не истёк."""
+        brand = self.data['brands'].get(name)
+        if not brand or not brand.get('checked_at'):
+            return 'new'
+        if brand.get('status') not in ('ok', 'unchanged'):
+            return 'failed'
+        age_hours = (now - brand['checked_at']) / 3600
+        if age_hours + DUE_SLACK_HOURS >= self.ttl_hours(name, cfg, now):
+            return 'ttl'
+        return None
+
+    def full_sweep_due(self, now):
+        last = self.data.get('last_full_sweep')
+        return not last or (now - last) / 3600 >= FULL_SWEEP_HOURS
+
+    def select(self, brands, forced=(), full=False, now=None):
+        """
+        Возвращает (бренды для запуска, причины по имени, это полный обход или нет).
+        forced - имена брендов, которые запускаются в любом случае.
+        """
+        now = now or time.time()
+        full = full or self.full_sweep_due(now)
+        selected = []
+        reasons = {}
+        for name, cfg in brands:
+            reason = 'forced' if name in forced else ('full' if full else self.reason(name, cfg, now))
+            if reason:
+                selected.append((name, cfg))
+                reasons[name] = reason
+        return selected, reasons, full
+
+    def record(self, results, full=False, now=None):
+        now = now or time.time()
+        for result in results:
+            brand = self.data['brands'].setdefault(result['brand'], {'history': []})
+            brand['checked_at'] = now
+            brand['status'] = result['status']
+            if result['status'] in ('ok', 'unchanged'):
+                changed = is_changed(result)
+                brand['history'] = (brand.get('history', []) + [[now, changed]])[-HISTORY_SIZE:]
+                if changed:
+                    brand['changed_at'] = now
+        if full:
+            self.data['last_full_sweep'] = now
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            payload = json.dumps(self.data, ensure_ascii=False, indent=2).encode('utf-8')
+            atomic_write(self.path, payload)
+        except OSError as e:
+            logError("Ошибка при сохранении расписания", f"{self.path}: {e}")
+
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)) if timestamp else '-'
+
+
+def print_schedule(schedule, manifest, now=None):
+    now = now or time.time()
+    print(f"Последний полный обход: {format_time(schedule.data.get('last_full_sweep'))}")
+    print(f"{'brand':<16} {'ttl,h':>6} {'checks':>6} {'changes':>7} {'checked':>17} {'changed':>17}  due")
+    for name, cfg in manifest.items():
+        if not cfg.get('enabled', True):
+            continue
+        brand = schedule.data['brands'].get(name, {})
+        history = brand.get('history', [])
+        changes = sum(1 for _, changed in history if changed)
+        reason = schedule.reason(name, cfg, now) or '-'
+        print(f"{name:<16} {schedule.ttl_hours(name, cfg, now):>6.1f} {len(history):>6} {changes:>7} "
+              f"{format_time(brand.get('checked_at')):>17} {format_time(brand.get('changed_at')):>17}  {reason}")
+
+
+def main(argv=None):
+    from scrape_all import MANIFEST_PATH, load_manifest
+
+    parser = argparse.ArgumentParser(description='Расписание обновления брендов')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='Путь к манифесту брендов')
+    parser.add_argument('--schedule', default=SCHEDULE_PATH, help='Файл расписания')
+    args = parser.parse_args(argv)
+
+    print_schedule(Schedule(args.schedule), load_manifest(args.manifest))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк размера и времени разбора файлов с ценами в разных форматах.
+
+Для complectations-prices.json сравниваются:
+  current - файл как он есть (строковые цены, отступ 2);
+  typed   - цены и выгоды int, отступ 2 (вывод по умолчанию);
+  compact - цены int, без отступов, комплектации столбцами (COMPLECTATIONS_PRICE_COMPACT=1).
+Для cars.json: current, typed и minified (typed без отступов).
+
+Пример:
+    python3 .github/scripts/updateComplectationsPrices/bench_prices_json.py --repeat 200
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import time
+
+from download_complectations_prices import DATA_DIR, OUTPUT_FILENAME, from_columnar, normalize_price, serialize_json
+
+CARS_PATH = DATA_DIR / "cars.json"
+
+
+def typed_complectations(data):
+    data = from_columnar(data)
+    return {
+        brand: [
+            {
+                **model,
+                "complectations": [
+                    {
+                        **complectation,
+                        "price": normalize_price(complectation["price"]),
+                        "benefit": normalize_price(complectation["benefit"], empty=0),
+                    }
+                    for complectation in model["complectations"]
+                ]
+            }
+            for model in models
+        ]
+        for brand, models in data.items()
+    }
+
+
+def typed_cars(data):
+    return [
+        {**item, "price": normalize_price(item.get("price")), "benefit": normalize_price(item.get("benefit"), empty=0)}
+        for item in data
+    ]
+
+
+def complectations_variants(raw):
+    data = typed_complectations(json.loads(raw))
+    return (
+        ('current', raw),
+        ('typed', serialize_json(data, compact=False)),
+        ('compact', serialize_json(data, compact=True)),
+    )
+
+
+def cars_variants(raw):
+    data = typed_cars(json.loads(raw))
+    return (
+        ('current', raw),
+        ('typed', json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')),
+        ('minified', json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+    )
+
+
+def parse_time(payload, repeat):
+    """Лучшее время json.loads в секундах (первый прогон - разогрев)."""
+    json.loads(payload)
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        json.loads(payload)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench(path, variants, repeat):
+    with open(path, 'rb') as f:
+        raw = f.read()
+
+    print(f"{path}")
+    print(f"  {'format':<10} {'bytes':>9} {'gzip':>9} {'size':>7} {'parse ms':>9} {'speed':>7}")
+    base_size = base_time = None
+    for name, payload in variants(raw):
+        seconds = parse_time(payload, repeat)
+        base_size = base_size or len(payload)
+        base_time = base_time or seconds
+        print(f"  {name:<10} {len(payload):>9} {len(gzip.compress(payload)):>9} "
+              f"{len(payload) / base_size:>6.0%} {seconds * 1000:>9.3f} {base_time / seconds:>6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Размер и время разбора файлов цен в разных форматах')
+    parser.add_argument('--complectations', default=str(DATA_DIR / OUTPUT_FILENAME), help='Путь к complectations-prices.json')
+    parser.add_argument('--cars', default=str(CARS_PATH), help='Путь к cars.json')
+    parser.add_argument('--repeat', type=int, default=100, help='Число прогонов разбора, берётся лучший')
+    args = parser.parse_args(argv)
+
+    bench(args.complectations, complectations_variants, args.repeat)
+    bench(args.cars, cars_variants, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,17 +2,29 @@
 
 """
 Скрипт для скачивания данных о комплектациях и ценах из Google Таблицы.
-Преобразует данные в JSON формат и сохраняет в корень проекта.
+Преобразует данные в JSON формат и сохраняет в src/complectations-prices.json,
+а каждому сайту дилера - в src/<сайт>/data/complectations-prices.json
+только бренды из его settings.json.
 """
 
 import csv
+import hashlib
+import io
 import json
 import os
+import re
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any
-from urllib.request import urlopen
-from urllib.error import URLError
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Общие модули .github/scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from prices import normalize_price
 
 # Индексы колонок (A=0, B=1, C=2, D=3, E=4, F=5)
 COLUMN_MARK_ID = 0      # A - mark_id (бренд)
@@ -32,7 +44,24 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
 DATA_DIR = PROJECT_ROOT / "src"
 
 # Путь к файлу настроек
-SETTINGS_PATH = DATA_DIR / "settings.json"
+SETTINGS_FILENAME = "settings.json"
+SETTINGS_PATH = DATA_DIR / SETTINGS_FILENAME
+
+# Поля комплектации в порядке вывода (и столбцы компактной раскладки)
+COMPLECTATION_KEYS = ("name", "price", "benefit")
+
+# Значения поля brand в шаблонах сайтов, а не настоящие бренды
+PLACEHOLDER_BRANDS = {"brand"}
+
+# Валидаторы и хэши прошлого скачивания (каталог .cache не коммитится)
+STATE_PATH = PROJECT_ROOT / ".cache" / "complectations-prices-state.json"
+
+# Размер блока чтения ответа
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Сколько листов скачивается одновременно и таймаут запроса в секундах
+DOWNLOAD_WORKERS = int(os.getenv('COMPLECTATIONS_PRICE_WORKERS', '4'))
+DOWNLOAD_TIMEOUT = 60
 
 def load_env_config() -> Dict[str, str]:
     """
@@ -59,7 +88,20 @@ def load_env_config() -> Dict[str, str]:
     
     return config
 
-def load_brands_from_settings() -> List[str]:
+def parse_brand_field(brand_value: Any) -> List[str]:
+    """
+    Разбирает поле brand из settings.json: один бренд или несколько через запятую.
+    
+    Returns:
+        Список брендов в нижнем регистре (пустой, если поле не строка или пустое)
+    """
+    if not isinstance(brand_value, str):
+        return []
+    # Разделяем по запятой, убираем пробелы и приводим к нижнему регистру
+    return [brand.strip().lower() for brand in brand_value.split(',') if brand.strip()]
+
+
+def load_brands_from_settings(settings_path: Path = SETTINGS_PATH) -> List[str]:
     """
     Загружает список брендов из settings.json.
     Поле brand может содержать один бренд или несколько через запятую.
@@ -71,11 +113,11 @@ def load_brands_from_settings() -> List[str]:
     print("Загрузка брендов из settings.json...")
     
     try:
-        if not SETTINGS_PATH.exists():
-            print(f"⚠ Файл {SETTINGS_PATH} не найден. Будут использованы все бренды.")
+        if not settings_path.exists():
+            print(f"⚠ Файл {settings_path} не найден. Будут использованы все бренды.")
             return []
         
-        with open(SETTINGS_PATH, 'r', encoding='utf-8') as f:
+        with open(settings_path, 'r', encoding='utf-8') as f:
             settings = json.load(f)
         
         brand_value = settings.get('brand')
@@ -88,8 +130,7 @@ def load_brands_from_settings() -> List[str]:
             print(f"⚠ Неожиданный тип поля 'brand': {type(brand_value)}. Будут использованы все бренды.")
             return []
         
-        # Разделяем по запятой, убираем пробелы и приводим к нижнему регистру
-        brands = [brand.strip().lower() for brand in brand_value.split(',') if brand.strip()]
+        brands = parse_brand_field(brand_value)
         
         if not brands:
             print("⚠ Поле 'brand' пустое. Будут использованы все бренды.")
@@ -102,10 +143,11 @@ def load_brands_from_settings() -> List[str]:
         print(f"⚠ Ошибка при чтении settings.json: {e}. Будут использованы все бренды.")
         return []
 
-def convert_to_export_url(url: str) -> str:
-    """Преобразует URL Google Sheets из формата edit в export (CSV)"""
-    import re
-    
+def convert_to_export_url(url: str, gid: Optional[str] = None) -> str:
+    """
+    Преобразует URL Google Sheets из формата edit в export (CSV).
+    Если gid передан явно, он заменяет gid из URL.
+    """
     # Извлекаем spreadsheet ID
     match = re.search(r'/spreadsheets/d/([a-zA-Z0-9-_]+)', url)
     if not match:
@@ -114,65 +156,246 @@ def convert_to_export_url(url: str) -> str:
     spreadsheet_id = match.group(1)
     
     # Извлекаем gid
-    gid_match = re.search(r'[?&#]gid=([0-9]+)', url)
-    gid = gid_match.group(1) if gid_match else '0'
+    if gid is None:
+        gid_match = re.search(r'[?&#]gid=([0-9]+)', url)
+        gid = gid_match.group(1) if gid_match else '0'
     
     # Формируем URL для экспорта
     return f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv&gid={gid}"
 
 
+def parse_export_urls(raw_value: str) -> List[str]:
+    """
+    Разбирает список источников из COMPLECTATIONS_PRICE_CSV_URL.
+    
+    Источники перечисляются через запятую или пробел. Каждый элемент - URL
+    таблицы или просто gid: он означает другой лист таблицы из ближайшего
+    предыдущего URL. Например:
+        https://docs.google.com/spreadsheets/d/ID/edit#gid=0, 12345, 67890
+    
+    Returns:
+        URL для экспорта в CSV без повторов, в порядке перечисления
+        (этот порядок определяет приоритет при конфликтах)
+    """
+    export_urls: List[str] = []
+    last_url = None
+    
+    for item in re.split(r'[\s,]+', raw_value.strip()):
+        if not item:
+            continue
+        if item.isdigit():
+            if last_url is None:
+                raise ValueError(f"gid {item} указан раньше URL таблицы")
+            export_url = convert_to_export_url(last_url, item)
+        else:
+            last_url = item
+            export_url = convert_to_export_url(item)
+        
+        if export_url not in export_urls:
+            export_urls.append(export_url)
+    
+    return export_urls
+
+
+def source_label(url: str) -> str:
+    """Короткое имя листа для логов: начало ID таблицы и gid."""
+    match = re.search(r'/spreadsheets/d/([a-zA-Z0-9-_]+)/export\?format=csv&gid=([0-9]+)', url)
+    if not match:
+        return url
+    return f"{match.group(1)[:8]}:{match.group(2)}"
+
+
 ENV_CONFIG = load_env_config()
 
 
 raw_url = ENV_CONFIG.get('COMPLECTATIONS_PRICE_CSV_URL')
-EXPORT_CSV_URL = None
+EXPORT_CSV_URLS: List[str] = []
 
 if raw_url:
-    EXPORT_CSV_URL = convert_to_export_url(raw_url)
+    EXPORT_CSV_URLS = parse_export_urls(raw_url)
 else:
     # Если переменная не найдена - это не критично, просто пропускаем скачивание
-    EXPORT_CSV_URL = None
+    EXPORT_CSV_URLS = []
+
+# Компактный вывод: JSON без отступов, комплектации модели - столбцами (см. to_columnar)
+COMPACT_OUTPUT = (os.getenv('COMPLECTATIONS_PRICE_COMPACT') or ENV_CONFIG.get('COMPLECTATIONS_PRICE_COMPACT', '')).lower() in ('1', 'true', 'yes')
+
+# Формат выходного файла; при его смене прошлый результат не переиспользуется
+OUTPUT_FORMAT = 'typed-compact' if COMPACT_OUTPUT else 'typed'
+
+def load_state() -> Dict[str, Any]:
+    """
+    Загружает состояние прошлого скачивания: валидаторы HTTP (ETag,
+    Last-Modified) и хэш CSV по каждому URL, а также хэш сохраненного JSON.
+    
+    Returns:
+        Словарь состояния (пустой, если файла нет или он поврежден)
+    """
+    if not STATE_PATH.exists():
+        return {}
+    
+    try:
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠ Ошибка при чтении {STATE_PATH}: {e}. Данные будут скачаны заново.")
+        return {}
+
+
+def save_state(state: Dict[str, Any]) -> None:
+    try:
+        STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # Через временный файл: оборванная запись не оставит обрезанное состояние
+        tmp_path = STATE_PATH.with_name(STATE_PATH.name + '.tmp')
+        tmp_path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+        os.replace(tmp_path, STATE_PATH)
+    except Exception as e:
+        # Без состояния следующий запуск просто скачает все заново
+        print(f"⚠ Ошибка при сохранении {STATE_PATH}: {e}")
+
+
+def file_sha256(path: Path) -> Optional[str]:
+    if not path.exists():
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def create_session(workers: int) -> requests.Session:
+    """
+    Общая сессия для всех листов: соединения keep-alive переиспользуются
+    между запросами, пул рассчитан на число параллельных загрузок.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip'
+    return session
+
 
-def download_spreadsheet_data(url: str) -> List[List[str]]:
+def download_spreadsheet(session: requests.Session, url: str, source_state: Dict[str, str]) -> Optional[Dict[str, Any]]:
     """
-    Скачивает данные из Google Таблицы в формате CSV.
+    Скачивает CSV из Google Таблицы во временный файл, считая хэш по ходу чтения.
+    
+    Ответ запрашивается со сжатием gzip и читается блоками: в памяти находится
+    только текущий блок, весь CSV лежит во временном файле.
+    Если в source_state есть валидаторы прошлого скачивания, запрос условный.
     
     Args:
+        session: Сессия requests с пулом соединений
         url: URL для экспорта таблицы в CSV
+        source_state: Состояние прошлого скачивания этого URL (etag, last_modified)
         
     Returns:
-        Список строк, где каждая строка - это список значений колонок
+        Словарь с ключами file (файл с CSV, указатель в начале), sha256, etag,
+        last_modified или None, если сервер ответил 304 Not Modified
         
     Raises:
-        URLError: Если не удалось скачать данные
+        requests.RequestException: Если не удалось скачать данные
         Exception: Другие ошибки при скачивании
     """
-    print(f"Скачивание данных из Google Таблицы...")
+    label = source_label(url)
+    print(f"[{label}] Скачивание данных из Google Таблицы...")
+    
+    headers = {}
+    if source_state.get('etag'):
+        headers['If-None-Match'] = source_state['etag']
+    if source_state.get('last_modified'):
+        headers['If-Modified-Since'] = source_state['last_modified']
     
     try:
-        with urlopen(url) as response:
-            # Читаем данные и декодируем из UTF-8
-            csv_data = response.read().decode('utf-8')
+        with session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 304:
+                # Дочитываем пустое тело, чтобы соединение вернулось в пул, а не закрылось
+                response.content
+                print(f"[{label}] ✓ Лист не изменился с прошлого скачивания (304 Not Modified)")
+                return None
+            response.raise_for_status()
             
-        # Парсим CSV
-        csv_reader = csv.reader(csv_data.splitlines())
-        data = list(csv_reader)
-        
-        print(f"✓ Успешно скачано {len(data)} строк")
-        return data
+            # iter_content распаковывает gzip по мере чтения
+            sha256 = hashlib.sha256()
+            csv_file = tempfile.TemporaryFile()
+            size = 0
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                sha256.update(chunk)
+                csv_file.write(chunk)
+                size += len(chunk)
+            csv_file.seek(0)
+            
+            print(f"[{label}] ✓ Успешно скачано {size} байт")
+            return {
+                "file": csv_file,
+                "sha256": sha256.hexdigest(),
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+            }
         
-    except URLError as e:
-        print(f"✗ Ошибка при скачивании: {e}")
+    except requests.RequestException as e:
+        print(f"[{label}] ✗ Ошибка при скачивании: {e}")
         raise
     except Exception as e:
-        print(f"✗ Неожиданная ошибка: {e}")
+        print(f"[{label}] ✗ Неожиданная ошибка: {e}")
         raise
 
 
-def transform_to_json(data: List[List[str]]) -> Dict[str, List[Dict[str, Any]]]:
+def download_all(session: requests.Session, urls: List[str],
+                 sources_state: Dict[str, Dict[str, str]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Скачивает листы параллельно. Результаты возвращаются в порядке urls,
+    а не в порядке завершения загрузок (None - лист не изменился, 304).
+    """
+    workers = max(1, min(DOWNLOAD_WORKERS, len(urls)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(download_spreadsheet, session, url, sources_state.get(url, {}))
+            for url in urls
+        ]
+    
+    # После выхода из with все загрузки завершены
+    errors = [future.exception() for future in futures if future.exception()]
+    if errors:
+        # Закрываем временные файлы листов, которые успели скачаться
+        for future in futures:
+            if not future.exception() and future.result():
+                future.result()["file"].close()
+        raise errors[0]
+    
+    return [future.result() for future in futures]
+
+
+def iter_csv_rows(csv_file: BinaryIO) -> Iterator[List[str]]:
+    """
+    Читает CSV построчно, декодируя UTF-8 по мере чтения.
+    
+    Yields:
+        Строки CSV, каждая строка - это список значений колонок
+    """
+    # newline='' - переводы строк внутри кавычек обрабатывает csv.reader
+    text = io.TextIOWrapper(csv_file, encoding='utf-8', newline='')
+    rows_count = 0
+    for row in csv.reader(text):
+        rows_count += 1
+        yield row
+    print(f"✓ Прочитано {rows_count} строк CSV")
+
+
+def transform_to_json(*sources: Iterable[List[str]]) -> Dict[str, List[Dict[str, Any]]]:
     """
     Преобразует данные из CSV в JSON формат с группировкой по брендам и моделям.
     
+    Строки обрабатываются по одной по мере поступления, поэтому сюда можно
+    передать как списки, так и потоки строк из iter_csv_rows. Если передано
+    несколько листов, они сливаются в одну структуру в порядке перечисления:
+    - бренды и модели идут в порядке первого появления;
+    - название модели берется из первого листа, где она встретилась;
+    - комплектация модели, которая уже есть в одном из предыдущих листов
+      (то же название), пропускается - приоритет у листа, указанного раньше.
+    Повторы внутри одного листа сохраняются, как и раньше.
+    
+    Цена и выгода приводятся к int (см. normalize_price): пустая цена - null,
+    пустая выгода - 0.
+    
     Структура результата:
     {
         "Belgee": [
@@ -180,7 +403,7 @@ def transform_to_json(data: List[List[str]]) -> Dict[str, List[Dict[str, Any]]]:
                 "model_name": "S50",
                 "model_id": "s50",
                 "complectations": [
-                    {"name": "Active 5MT", "price": "1849990", "benefit": "200000"},
+                    {"name": "Active 5MT", "price": 1849990, "benefit": 200000},
                     ...
                 ]
             },
@@ -190,100 +413,319 @@ def transform_to_json(data: List[List[str]]) -> Dict[str, List[Dict[str, Any]]]:
     }
     
     Args:
-        data: Список строк из CSV (первая строка - заголовки)
+        sources: Строки CSV каждого листа (первая строка - заголовки)
         
     Returns:
         Объект с брендами, моделями и комплектациями
     """
     print("Преобразование данных в JSON...")
     
-    # Пропускаем заголовок (первая строка)
-    rows = data[1:] if len(data) > 1 else []
-    
+    # Модели сразу создаются в итоговом виде, бренд -> model_id -> модель
     brands_dict: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    # Названия комплектаций из уже обработанных листов: (бренд, model_id) -> названия
+    earlier_names: Dict[Tuple[str, str], Set[str]] = {}
+    total_complectations = 0
+    conflicts = 0
     
-    for row in rows:
-        # Пропускаем пустые строки
-        if not row or len(row) < 6:
-            continue
-            
-        # Извлекаем значения
-        mark_id = row[COLUMN_MARK_ID].strip() if len(row) > COLUMN_MARK_ID else ""
-        model_id = row[COLUMN_MODEL_ID].strip() if len(row) > COLUMN_MODEL_ID else ""
-        model_name = row[COLUMN_MODEL_NAME].strip() if len(row) > COLUMN_MODEL_NAME else ""
-        complectation_name = row[COLUMN_COMPLECTATION_NAME].strip() if len(row) > COLUMN_COMPLECTATION_NAME else ""
-        price_str = row[COLUMN_PRICE].strip() if len(row) > COLUMN_PRICE else ""
-        benefit_str = row[COLUMN_BENEFIT].strip() if len(row) > COLUMN_BENEFIT else ""
+    for rows in sources:
+        rows = iter(rows)
         
-        # Пропускаем строки без обязательных данных
-        if not mark_id or not model_id or not model_name:
-            continue
+        # Пропускаем заголовок (первая строка)
+        next(rows, None)
         
-        # Инициализируем бренд, если его еще нет
-        if mark_id not in brands_dict:
-            brands_dict[mark_id] = {}
+        source_names: Dict[Tuple[str, str], Set[str]] = {}
         
-        # Инициализируем модель, если ее еще нет
-        if model_id not in brands_dict[mark_id]:
-            brands_dict[mark_id][model_id] = {
-                "model_name": model_name,
-                "complectations": []
-            }
+        for row in rows:
+            # Пропускаем пустые строки
+            if not row or len(row) < 6:
+                continue
+                
+            # Извлекаем значения
+            mark_id = row[COLUMN_MARK_ID].strip()
+            model_id = row[COLUMN_MODEL_ID].strip()
+            model_name = row[COLUMN_MODEL_NAME].strip()
+            complectation_name = row[COLUMN_COMPLECTATION_NAME].strip()
+            price_str = row[COLUMN_PRICE].strip()
+            benefit_str = row[COLUMN_BENEFIT].strip()
+            
+            # Пропускаем строки без обязательных данных
+            if not mark_id or not model_id or not model_name:
+                continue
+            
+            # Инициализируем бренд, если его еще нет
+            models = brands_dict.setdefault(mark_id, {})
+            
+            # Инициализируем модель, если ее еще нет
+            model = models.get(model_id)
+            if model is None:
+                model = models[model_id] = {
+                    "model_name": model_name,
+                    "model_id": model_id,
+                    "complectations": []
+                }
+            
+            # Добавляем комплектацию, если есть название
+            if complectation_name:
+                key = (mark_id, model_id)
+                if complectation_name in earlier_names.get(key, ()):
+                    conflicts += 1
+                    continue
+                source_names.setdefault(key, set()).add(complectation_name)
+                model["complectations"].append({
+                    "name": complectation_name,
+                    "price": normalize_price(price_str),
+                    "benefit": normalize_price(benefit_str, empty=0)
+                })
+                total_complectations += 1
         
-        # Добавляем комплектацию, если есть название
-        if complectation_name:
-            complectation = {
-                "name": complectation_name,
-                "price": price_str,
-                "benefit": benefit_str
-            }
-            brands_dict[mark_id][model_id]["complectations"].append(complectation)
-    
-    # Преобразуем в финальную структуру
-    result: Dict[str, List[Dict[str, Any]]] = {}
+        for key, names in source_names.items():
+            earlier_names.setdefault(key, set()).update(names)
     
-    for mark_id, models in brands_dict.items():
-        result[mark_id] = []
-        
-        for model_id, model_data in models.items():
-            # Создаем объект модели
-            model_obj = {
-                "model_name": model_data["model_name"],
-                "model_id": model_id,
-                "complectations": model_data["complectations"]
-            }
-            result[mark_id].append(model_obj)
+    # Преобразуем в финальную структуру (порядок моделей - порядок появления в таблице)
+    result: Dict[str, List[Dict[str, Any]]] = {
+        mark_id: list(models.values())
+        for mark_id, models in brands_dict.items()
+    }
     
     # Подсчет статистики
     total_models = sum(len(models) for models in result.values())
-    total_complectations = sum(
-        len(model["complectations"])
-        for brand_models in result.values()
-        for model in brand_models
-    )
     
     print(f"✓ Обработано {len(result)} брендов, {total_models} моделей, {total_complectations} комплектаций")
+    if conflicts:
+        print(f"⚠ Пропущено {conflicts} комплектаций, уже заданных в листах выше по списку")
     return result
 
 
-def save_json_file(data: Dict[str, Any], output_path: Path) -> None:
+def to_columnar(data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Компактная раскладка: комплектации модели хранятся столбцами
+    {"name": [...], "price": [...], "benefit": [...]} вместо списка объектов,
+    так ключи не повторяются в каждой комплектации.
+    """
+    return {
+        brand: [
+            {
+                **model,
+                "complectations": {
+                    key: [complectation[key] for complectation in model["complectations"]]
+                    for key in COMPLECTATION_KEYS
+                }
+            }
+            for model in models
+        ]
+        for brand, models in data.items()
+    }
+
+
+def from_columnar(data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Обратное к to_columnar; модели в обычной раскладке возвращаются как есть."""
+    return {
+        brand: [
+            model if isinstance(model["complectations"], list) else {
+                **model,
+                "complectations": [
+                    dict(zip(COMPLECTATION_KEYS, values))
+                    for values in zip(*(model["complectations"][key] for key in COMPLECTATION_KEYS))
+                ]
+            }
+            for model in models
+        ]
+        for brand, models in data.items()
+    }
+
+
+def serialize_json(data: Dict[str, Any], compact: bool = COMPACT_OUTPUT) -> bytes:
+    if compact:
+        return json.dumps(to_columnar(data), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # Тот же формат, что и раньше: отступ 2, без экранирования кириллицы
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def write_if_changed(payload: bytes, output_path: Path) -> bool:
+    """
+    Записывает файл, только если содержимое отличается от уже записанного.
+    Пишет во временный файл и подменяет: читатели не увидят недописанный JSON.
+    
+    Returns:
+        True - файл записан, False - содержимое совпало и запись пропущена
+    """
+    if output_path.exists() and output_path.read_bytes() == payload:
+        return False
+    
+    # Создаем директорию, если не существует
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    tmp_path.write_bytes(payload)
+    os.replace(tmp_path, output_path)
+    return True
+
+
+def save_json_file(payload: bytes, output_path: Path) -> bool:
+    """
+    Сохраняет JSON, если он отличается от уже записанного файла.
+    
+    Returns:
+        True - файл записан, False - содержимое совпало и запись пропущена
+    """
     print(f"Сохранение данных в {output_path}...")
     
     try:
-        # Создаем директорию, если не существует
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Сохраняем с отступами для читаемости
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if not write_if_changed(payload, output_path):
+            print(f"✓ Файл не изменился, запись пропущена: {output_path}")
+            return False
         
         print(f"✓ Файл успешно сохранен: {output_path}")
+        return True
         
     except Exception as e:
         print(f"✗ Ошибка при сохранении файла: {e}")
         raise
 
 
+def build_brand_sites_index(data_dir: Path = DATA_DIR) -> Dict[str, List[str]]:
+    """
+    Один проход по src/*/data/settings.json: бренд (в нижнем регистре) -> сайты.
+    Сайты без брендов (пустое поле или заглушка шаблона) в индекс не попадают.
+    """
+    index: Dict[str, List[str]] = {}
+    
+    for settings_path in sorted(data_dir.glob(f"*/data/{SETTINGS_FILENAME}")):
+        site = settings_path.parent.parent.name
+        try:
+            with open(settings_path, 'r', encoding='utf-8') as f:
+                brands = parse_brand_field(json.load(f).get('brand'))
+        except Exception as e:
+            print(f"⚠ Ошибка при чтении {settings_path}: {e}")
+            continue
+        
+        for brand in brands:
+            if brand in PLACEHOLDER_BRANDS:
+                continue
+            index.setdefault(brand, []).append(site)
+    
+    return index
+
+
+def write_dealer_slices(data: Dict[str, List[Dict[str, Any]]], data_dir: Path = DATA_DIR) -> Dict[str, int]:
+    """
+    Записывает каждому сайту src/<сайт>/data/complectations-prices.json
+    только с его брендами (бренды сопоставляются без учета регистра).
+    
+    Файл, который не изменился, не перезаписывается; у сайта, для брендов
+    которого в таблице нет цен, устаревший файл удаляется.
+    
+    Returns:
+        Счетчики: sites, written, unchanged, removed
+    """
+    print("Формирование цен комплектаций для сайтов дилеров...")
+    
+    index = build_brand_sites_index(data_dir)
+    sites = {site for site_list in index.values() for site in site_list}
+    
+    # Бренды идут в порядке общего файла
+    slices: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for brand, models in data.items():
+        for site in index.get(brand.lower(), ()):
+            slices.setdefault(site, {})[brand] = models
+    
+    stats = {"sites": len(slices), "written": 0, "unchanged": 0, "removed": 0}
+    for site in sorted(sites):
+        output_path = data_dir / site / "data" / OUTPUT_FILENAME
+        if site not in slices:
+            if output_path.exists():
+                output_path.unlink()
+                stats["removed"] += 1
+            continue
+        if write_if_changed(serialize_json(slices[site]), output_path):
+            stats["written"] += 1
+        else:
+            stats["unchanged"] += 1
+    
+    print(f"✓ Сайтов с ценами: {stats['sites']}, записано: {stats['written']}, "
+          f"без изменений: {stats['unchanged']}, удалено устаревших: {stats['removed']}")
+    return stats
+
+
+def update_complectations_prices(urls: List[str], output_path: Path) -> str:
+    """
+    Скачивает листы таблиц и обновляет JSON, пропуская лишнюю работу.
+    
+    Преобразование пропускается, если ни один лист не изменился (304 или тот
+    же хэш CSV) и сохраненный JSON совпадает с записанным в прошлый раз.
+    Запись пропускается, если новый JSON побайтно совпадает с файлом.
+    
+    Returns:
+        Итог: 'not_modified', 'csv_unchanged', 'unchanged' или 'updated'
+    """
+    state = load_state()
+    sources_state = state.get("sources", {})
+    
+    # Прошлые данные можно переиспользовать, только если файл на месте и не правился вручную
+    output_intact = bool(state.get("output_sha256")) and file_sha256(output_path) == state.get("output_sha256")
+    # Файл записан в другом формате (строковые цены, другой режим compact) - собираем заново
+    output_intact = output_intact and state.get("format") == OUTPUT_FORMAT
+    # Список листов или их порядок (приоритет) изменился - прошлый результат к нему не относится
+    if not output_intact or list(sources_state) != urls:
+        sources_state = {}
+    
+    with create_session(DOWNLOAD_WORKERS) as session:
+        downloads = download_all(session, urls, sources_state)
+        
+        if all(download is None for download in downloads):
+            return 'not_modified'
+        
+        unchanged = all(
+            download is None or download["sha256"] == sources_state.get(url, {}).get("sha256")
+            for url, download in zip(urls, downloads)
+        )
+        
+        # Листам с 304 нужны данные для слияния с изменившимися - скачиваем их без условий
+        if not unchanged:
+            missing = [url for url, download in zip(urls, downloads) if download is None]
+            if missing:
+                refetched = iter(download_all(session, missing, {}))
+                downloads = [download or next(refetched) for download in downloads]
+    
+    try:
+        new_sources = {}
+        for url, download in zip(urls, downloads):
+            new_sources[url] = sources_state[url] if download is None else {
+                "etag": download["etag"],
+                "last_modified": download["last_modified"],
+                "sha256": download["sha256"],
+            }
+        state["sources"] = new_sources
+        
+        if unchanged:
+            print("✓ Хэши CSV совпадают с прошлым скачиванием, преобразование пропущено")
+            save_state(state)
+            return 'csv_unchanged'
+        
+        # Сливаем листы по порядку без фильтрации по брендам
+        json_data = transform_to_json(*(iter_csv_rows(download["file"]) for download in downloads))
+    finally:
+        for download in downloads:
+            if download is not None:
+                download["file"].close()
+    
+    payload = serialize_json(json_data)
+    written = save_json_file(payload, output_path)
+    state["output_sha256"] = hashlib.sha256(payload).hexdigest()
+    state["format"] = OUTPUT_FORMAT
+    save_state(state)
+    return 'updated' if written else 'unchanged'
+
+
+# Сообщения итоговой сводки по результату update_complectations_prices
+SUMMARY_MESSAGES = {
+    'not_modified': "таблицы не изменились (304), файл не тронут",
+    'csv_unchanged': "CSV не изменились, преобразование и запись пропущены",
+    'unchanged': "данные совпали с сохраненными, запись пропущена",
+    'updated': "файл обновлен",
+}
+
+
 def main() -> int:
     """
     Главная функция для выполнения всего процесса.
@@ -297,7 +739,7 @@ def main() -> int:
     
     try:
         # Проверяем наличие URL для скачивания
-        if not EXPORT_CSV_URL:
+        if not EXPORT_CSV_URLS:
             print("⚠ Переменная COMPLECTATIONS_PRICE_CSV_URL не найдена в .env файле")
             print("⚠ Пропускаем скачивание цен комплектаций")
             
@@ -308,22 +750,28 @@ def main() -> int:
                 output_path.unlink()
                 print(f"✓ Файл {OUTPUT_FILENAME} удален")
             
+            # И файлы сайтов дилеров, собранные из него
+            write_dealer_slices({})
+            
             print("⚠ Для настройки добавьте в .env:")
             print("   COMPLECTATIONS_PRICE_CSV_URL=https://docs.google.com/.../edit#gid=...")
+            print("   (несколько листов - через запятую: URL или просто gid листа той же таблицы)")
             print("✓ ПРОПУЩЕНО")
             return 0
         
-        # 1. Скачиваем данные
-        raw_data = download_spreadsheet_data(EXPORT_CSV_URL)
-        
-        # 2. Преобразуем в JSON без фильтрации по брендам
-        json_data = transform_to_json(raw_data)
-        
-        # 3. Сохраняем файл
+        # Скачиваем, преобразуем и сохраняем, пропуская шаги без изменений
         output_path = DATA_DIR / OUTPUT_FILENAME
-        save_json_file(json_data, output_path)
+        result = update_complectations_prices(EXPORT_CSV_URLS, output_path)
+        
+        # Раскладываем цены по сайтам дилеров (и при неизменной таблице -
+        # у сайтов могли поменяться бренды в settings.json)
+        with open(output_path, 'r', encoding='utf-8') as f:
+            slices = write_dealer_slices(from_columnar(json.load(f)))
         
-        print("✓ ГОТОВО!")
+        print("=" * 70)
+        print(f"✓ ГОТОВО ({len(EXPORT_CSV_URLS)} листов): {SUMMARY_MESSAGES[result]}")
+        print(f"✓ Сайты дилеров: записано {slices['written']}, без изменений {slices['unchanged']}, "
+              f"удалено {slices['removed']}")
         return 0
         
     except Exception as e:
@@ -28,6 +28,20 @@ const writeJson = (filePath, data) => {
   }
 };
 
+// Комплектации модели списком объектов: в компактном файле они хранятся столбцами
+// { name: [...], price: [...], benefit: [...] }
+const complectationRows = (complectations) => {
+  if (Array.isArray(complectations)) {
+    return complectations;
+  }
+  const names = complectations?.name || [];
+  return names.map((name, i) => ({
+    name,
+    price: complectations.price?.[i],
+    benefit: complectations.benefit?.[i]
+  }));
+};
+
 // Функция для поиска модели по бренду и ID (регистронезависимо)
 const findModelByBrandAndId = (markId, modelId, complectationsPrices) => {
   // Приводим mark_id к нижнему регистру для поиска
@@ -118,17 +132,19 @@ const updateComplectationsPrices = () => {
     logInfo(`\n===== Бренд: ${brand} =====`);
     for (const { model, priceModel } of entries) {
       logInfo(`Обновление цен для модели: ${model.name || model.id}`);
+      const priceComplectations = complectationRows(priceModel.complectations);
 
       const updatedComplectations = model.complectations.map(complectation => {
         totalComplectations++;
 
-        const priceComplectation = priceModel.complectations.find(
+        const priceComplectation = priceComplectations.find(
           pc => pc.name?.toLowerCase() === complectation.name?.toLowerCase()
         );
 
         if (priceComplectation && priceComplectation.price) {
           const oldPrice = complectation.price;
-          let newPrice = priceComplectation.price;
+          // Цены в complectations-prices.json - числа, в models.json - строки
+          let newPrice = String(priceComplectation.price);
 
           if (priceComplectation.benefit) {
             const priceNum = parseInt(newPrice, 10);
@@ -1,5 +1,10 @@
 import os
+import sys
 import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / ".github" / "scripts"))
+from data_catalog import DataCatalog
 
 # Корневая папка
 base_dir = "/home/diywebdev/dev/astro/astro-json/src/"
@@ -11,22 +16,23 @@ required_files = ["menu.json"]
 created_files_count = 0
 folders_with_creations = 0
 
-for root, dirs, files in os.walk(base_dir):
-    if "data" in dirs:
-        data_dir = os.path.join(root, "data")
-        folder_created_any = False
+catalog = DataCatalog(base_dir)
+
+for site in catalog.sites():
+    data_dir = catalog.data_dir(site)
+    folder_created_any = False
 
-        for filename in required_files:
+    for filename in required_files:
+        if filename not in catalog.files(site):
             file_path = os.path.join(data_dir, filename)
-            if not os.path.exists(file_path):
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump([], f, ensure_ascii=False, indent=2)
-                created_files_count += 1
-                folder_created_any = True
-                print(f"Создан файл: {file_path}")
-
-        if folder_created_any:
-            folders_with_creations += 1
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump([], f, ensure_ascii=False, indent=2)
+            created_files_count += 1
+            folder_created_any = True
+            print(f"Создан файл: {file_path}")
+
+    if folder_created_any:
+        folders_with_creations += 1
 
 print("\n--- Итог ---")
 print(f"Создано файлов: {created_files_count}")
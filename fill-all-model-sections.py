@@ -10,11 +10,14 @@
 - Обрабатывает все проекты и извлекает секции для всех моделей
 """
 
+import sys
 import yaml
-import json
 from pathlib import Path
 from collections import defaultdict
 
+sys.path.insert(0, str(Path(__file__).parent / ".github" / "scripts"))
+from data_catalog import DataCatalog
+
 # Базовый путь к исходным файлам
 SOURCE_BASE_PATH = Path(__file__).parent / "src"
 
@@ -24,6 +27,9 @@ TARGET_BASE_PATH = Path(__file__).parent / "src" / "model-sections"
 # Путь к models.json для получения информации о брендах и моделях
 MODELS_JSON_PATH = Path(__file__).parent / "src" / "models.json"
 
+# Каталог данных сайтов: файлы находятся одним проходом, YAML и JSON разбираются по требованию
+catalog = DataCatalog(SOURCE_BASE_PATH)
+
 
 def normalize_mark_id(mark_id):
     """Нормализует mark_id для использования в пути файла"""
@@ -85,8 +91,7 @@ def extract_sections_from_file(source_file, models_cache=None):
         except Exception:
             pass
         
-        with open(source_file, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+        data = catalog.load(source_file)
         
         if not isinstance(data, list):
             return result
@@ -234,8 +239,7 @@ def find_mark_id_for_model(model_id, models_cache=None, project_dir_name=None):
             return None
         
         try:
-            with open(MODELS_JSON_PATH, 'r', encoding='utf-8') as f:
-                models_cache = json.load(f)
+            models_cache = catalog.load(MODELS_JSON_PATH)
         except Exception:
             return None
     
@@ -286,14 +290,13 @@ def main():
     models_cache = None
     if MODELS_JSON_PATH.exists():
         try:
-            with open(MODELS_JSON_PATH, 'r', encoding='utf-8') as f:
-                models_cache = json.load(f)
+            models_cache = catalog.load(MODELS_JSON_PATH)
             print(f"Загружен models.json: {len(models_cache)} моделей")
         except Exception as e:
             print(f"⚠ Ошибка при загрузке models.json: {e}")
     
     # Находим все файлы models-sections.yml
-    source_files = list(SOURCE_BASE_PATH.rglob("models-sections.yml"))
+    source_files = catalog.paths("models-sections.yml")
     print(f"Найдено файлов models-sections.yml: {len(source_files)}\n")
     
     # Словарь для хранения секций по брендам и моделям